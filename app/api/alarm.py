@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Request, WebSocket
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
-from core.crud import read_alarms
+from core.crud import read_alarm_rows
 import logging
 import json
 import asyncio
@@ -27,33 +27,31 @@ class AlarmApi:
         """
         WebSocket endpoint for real-time alarm updates
         """
-        await self.websocket_manager.connect_alarm(websocket)
+        if not await self.websocket_manager.connect_alarm(websocket):
+            return
 
         try:
             # Send initial data (all alarms sorted by priority and timestamp)
-            with self.database_manager.session_scope() as db:
-                initial_alarms = read_alarms(db)
-                initial_data = [alarm.to_json() for alarm in initial_alarms]
+            with self.database_manager.read_scope() as db:
+                initial_data = read_alarm_rows(db)
 
-                await self.websocket_manager.send_initial_alarm_data(websocket, initial_data)
+            await self.websocket_manager.send_initial_alarm_data(websocket, initial_data)
 
             # Keep connection alive and handle client messages
             while True:
-                try:
-                    # Wait for client messages (e.g., ping/pong)
-                    data = await websocket.receive_text()
-                    logger.info(f"Received alarm websocket message: {data}")
-                    # TODO: Validate Message
-                    # {"type":"acknowledge_alarm","data":{"alarm_id":6}}
-                    message = json.loads(data)
-                    if message.get("type") == "acknowledge_alarm":
-                        alarm_id = message["data"]["alarm_id"]
-                        payload = {"alarm_id": alarm_id}
-                        logger.info(f"Putting acknowledge_alarm command into event queue: {payload}")
-                        await self.event_queue.put((EventType.ALARM_ACKNOWLEDGE, payload))
-
-                except WebSocketDisconnect:
+                # Wait for client messages (pongs are handled by the manager)
+                data = await self.websocket_manager.receive("alarm", websocket)
+                if data is None:
                     break
+                logger.info(f"Received alarm websocket message: {data}")
+                # TODO: Validate Message
+                # {"type":"acknowledge_alarm","data":{"alarm_id":6}}
+                message = json.loads(data)
+                if message.get("type") == "acknowledge_alarm":
+                    alarm_id = message["data"]["alarm_id"]
+                    payload = {"alarm_id": alarm_id}
+                    logger.info(f"Putting acknowledge_alarm command into event queue: {payload}")
+                    await self.event_queue.put((EventType.ALARM_ACKNOWLEDGE, payload))
 
         except Exception as e:
             logger.error(f"Alarm WebSocket error: {e}")
@@ -0,0 +1,96 @@
+from fastapi import APIRouter, HTTPException, WebSocket
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import Optional
+import asyncio
+import json
+import logging
+
+from core.command_manager import CommandManager
+from core.websocket_manager import WebSocketManager
+
+logger = logging.getLogger(__name__)
+
+
+class CommandRequest(BaseModel):
+    command: str
+    args: dict = {}
+    timeout: Optional[float] = None
+
+
+class CommandApi:
+    def __init__(self, command_manager: CommandManager, websocket_manager: WebSocketManager):
+        self.router = APIRouter(prefix="/command", tags=["command"])
+        self.router.add_api_route("/stats", self.stats, response_class=JSONResponse, methods=["GET"])
+        self.router.add_api_route("/{device_id}", self.command, response_class=JSONResponse, methods=["POST"])
+        self.router.add_api_websocket_route("/ws", self.command_websocket)
+        self.command_manager = command_manager
+        self.websocket_manager = websocket_manager
+
+    async def command(self, device_id: str, request: CommandRequest):
+        """
+        Send a command to a device and wait for the plugin acknowledgement
+        """
+        try:
+            result = await self.command_manager.send(device_id, request.command, request.args, request.timeout)
+        except LookupError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+
+        if result["status"] == "timeout":
+            return JSONResponse(status_code=504, content=result)
+        return result
+
+    async def stats(self):
+        """
+        Command counters and end-to-end latency percentiles
+        """
+        return self.command_manager.get_stats()
+
+    async def command_websocket(self, websocket: WebSocket):
+        """
+        WebSocket endpoint for device commands
+        {"type":"command","data":{"request_id":"1","device_id":"steckdose_01","command":"turn_on","args":{}}}
+        """
+        if not await self.websocket_manager.connect_command(websocket):
+            return
+        running = set()
+
+        async def reply(message_type: str, data: dict):
+            await self.websocket_manager.send("command", websocket, json.dumps({"type": message_type, "data": data}))
+
+        async def execute(data: dict):
+            response = {"request_id": data.get("request_id")}
+            try:
+                response.update(await self.command_manager.send(
+                    data["device_id"], data["command"], data.get("args"), data.get("timeout")))
+            except (KeyError, LookupError) as e:
+                response.update({"status": "error", "error": str(e)})
+            await reply("command_result", response)
+
+        try:
+            # Heartbeat, Idle-Timeout und Limits wie bei den übrigen WebSockets (Pongs behandelt der Manager)
+            while True:
+                text = await self.websocket_manager.receive("command", websocket)
+                if text is None:
+                    break
+
+                try:
+                    message = json.loads(text)
+                except ValueError as e:
+                    await reply("error", {"error": f"Invalid JSON: {e}"})
+                    continue
+                if not isinstance(message, dict) or not isinstance(message.get("data", {}), dict):
+                    await reply("error", {"error": "Expected an object with an object as data"})
+                    continue
+                if message.get("type") == "command":
+                    # nicht blockieren, mehrere Kommandos dürfen gleichzeitig laufen
+                    task = asyncio.create_task(execute(message.get("data", {})))
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+
+        except Exception as e:
+            logger.error(f"Command WebSocket error: {e}")
+        finally:
+            self.websocket_manager.disconnect_command(websocket)
+            for task in running:
+                task.cancel()
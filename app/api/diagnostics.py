@@ -0,0 +1,148 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from typing import Optional
+import asyncio
+import hmac
+import logging
+import threading
+
+from core.diagnostics import LoopMonitor, SamplingProfiler, dump_tasks
+
+logger = logging.getLogger(__name__)
+
+
+class DiagnosticsApi:
+    """
+    Admin-only runtime diagnostics (ADMIN_TOKEN, sent as "Authorization: Bearer <token>"
+    or "X-Admin-Token"). Without a configured token all endpoints answer 404.
+    """
+
+    def __init__(self, admin_token: Optional[str], loop_monitor: LoopMonitor, max_profile_seconds: float = 60.0):
+        self.router = APIRouter(prefix="/admin/diagnostics", tags=["diagnostics"], dependencies=[Depends(self.authorize)])
+        self.router.add_api_route("/stats", self.stats, response_class=JSONResponse, methods=["GET"])
+        self.router.add_api_route("/tasks", self.tasks, response_class=JSONResponse, methods=["GET"])
+        self.router.add_api_route("/websockets", self.websockets, response_class=JSONResponse, methods=["GET"])
+        self.router.add_api_route("/profile", self.profile, methods=["GET"])
+        self.router.add_api_route("/slow-callbacks", self.slow_callbacks, response_class=JSONResponse, methods=["GET"])
+        self.router.add_api_route("/slow-callbacks", self.toggle_slow_callbacks, response_class=JSONResponse, methods=["POST"])
+        self.router.add_api_route("/handlers", self.handlers, response_class=JSONResponse, methods=["GET"])
+        self.router.add_api_route("/handlers", self.toggle_handlers, response_class=JSONResponse, methods=["POST"])
+        self.router.add_api_route("/history-store/rebuild", self.rebuild_history_store, response_class=JSONResponse,
+                                  methods=["POST"])
+        self.admin_token = admin_token
+        self.loop_monitor = loop_monitor
+        self.max_profile_seconds = max_profile_seconds
+        self._profiling = asyncio.Lock()
+
+    async def authorize(self, request: Request):
+        if not self.admin_token:
+            raise HTTPException(status_code=404)
+        token = request.headers.get("X-Admin-Token")
+        authorization = request.headers.get("Authorization", "")
+        if authorization.startswith("Bearer "):
+            token = authorization[len("Bearer "):]
+        # als Bytes vergleichen: compare_digest lehnt str mit Nicht-ASCII-Zeichen mit TypeError ab
+        if not token or not hmac.compare_digest(token.encode("utf-8"), self.admin_token.encode("utf-8")):
+            raise HTTPException(status_code=401, detail="Admin token required", headers={"WWW-Authenticate": "Bearer"})
+
+    async def stats(self, request: Request):
+        """
+        Queue lanes, scheduler lateness, replicas, commands, alarm engine, watchdog and startup timings
+        """
+        state = request.app.state
+        return {
+            "startup_ms": getattr(state, "startup_timings", None),
+            "queue": state.event_queue.get_stats(),
+            "scheduler": state.scheduler.get_stats() if hasattr(state, "scheduler") else None,
+            "replicas": state.database_manager.get_replica_stats(),
+            "commands": state.command_manager.get_stats(),
+            "websockets": state.websocket_manager.get_stats(),
+            "alarm_engine": state.alarm_engine.get_stats(),
+            "watchdog": state.watchdog.get_stats(),
+            "value_filter": state.value_filter.get_stats(),
+            "history_store": state.history_store.get_stats() if state.history_store is not None else None,
+            "loop_monitor": {key: value for key, value in self.loop_monitor.to_json().items() if key != "events"}
+        }
+
+    async def tasks(self, limit: int = 20):
+        """
+        All asyncio tasks with their current stack
+        """
+        tasks = dump_tasks(limit)
+        return {"count": len(tasks), "tasks": tasks}
+
+    async def websockets(self, request: Request):
+        """
+        Open websockets with channel, client, age, idle time and ping round trip
+        """
+        websocket_manager = request.app.state.websocket_manager
+        return {**websocket_manager.get_stats(), "list": websocket_manager.get_connections()}
+
+    async def profile(self, seconds: float = 5.0, interval: float = 0.005, format: str = "collapsed"):
+        """
+        Sample the event loop thread for `seconds`; collapsed stacks (flame graph input) or top functions as JSON
+        """
+        if format not in ("collapsed", "json"):
+            raise HTTPException(status_code=400, detail="format must be collapsed or json")
+        if not 0 < seconds <= self.max_profile_seconds or not 0.001 <= interval <= 1.0:
+            raise HTTPException(status_code=400, detail=f"seconds must be in (0, {self.max_profile_seconds}], "
+                                                        f"interval in [0.001, 1]")
+        if self._profiling.locked():
+            raise HTTPException(status_code=409, detail="A profile is already running")
+
+        async with self._profiling:
+            logger.info(f"Profiling event loop for {seconds}s")
+            profiler = SamplingProfiler(threading.get_ident(), interval)
+            samples = await asyncio.to_thread(profiler.run, seconds)
+
+        if format == "json":
+            return JSONResponse(SamplingProfiler.top(samples))
+        return PlainTextResponse(SamplingProfiler.collapsed(samples))
+
+    async def slow_callbacks(self):
+        """
+        Blocking callbacks detected by the loop monitor, with the stack at detection time
+        """
+        return self.loop_monitor.to_json()
+
+    async def toggle_slow_callbacks(self, enabled: bool, threshold_ms: Optional[float] = None):
+        """
+        Start or stop the loop monitor (no restart needed)
+        """
+        if threshold_ms is not None:
+            self.loop_monitor.threshold = threshold_ms / 1000
+        if enabled:
+            self.loop_monitor.start()
+        else:
+            await self.loop_monitor.stop()
+        logger.info(f"Loop monitor {'started' if enabled else 'stopped'}")
+        return self.loop_monitor.to_json()
+
+    async def handlers(self, request: Request):
+        """
+        Time per event handler and event type
+        """
+        event_manager = request.app.state.event_manager
+        return {"enabled": event_manager.handler_timing, "handlers": event_manager.get_handler_stats()}
+
+    async def toggle_handlers(self, request: Request, enabled: bool, reset: bool = False):
+        """
+        Switch per-handler timing on or off
+        """
+        event_manager = request.app.state.event_manager
+        event_manager.handler_timing = enabled
+        if reset:
+            event_manager.handler_stats.clear()
+        logger.info(f"Handler timing {'enabled' if enabled else 'disabled'}")
+        return {"enabled": event_manager.handler_timing, "handlers": event_manager.get_handler_stats()}
+
+    async def rebuild_history_store(self, request: Request):
+        """
+        Copy all values into the DuckDB history store again
+        """
+        history_store = request.app.state.history_store
+        if history_store is None:
+            raise HTTPException(status_code=404, detail="No history store configured (DUCKDB_PATH)")
+        logger.info("Rebuilding history store")
+        rows = await asyncio.to_thread(history_store.rebuild)
+        return {"rebuilt": rows, **history_store.get_stats()}
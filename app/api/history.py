@@ -0,0 +1,75 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from typing import Optional
+import logging
+
+from core.database_manager import DatabaseManager
+from core.history_io import TABLES, encode_csv, encode_ndjson, export_chunks, parse_time
+from core.history_store import HistoryStore, aggregate_rows
+
+logger = logging.getLogger(__name__)
+
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class HistoryApi:
+    def __init__(self, database_manager: DatabaseManager, history_store: Optional[HistoryStore] = None,
+                 chunk_size: int = 1000):
+        self.router = APIRouter(prefix="/history", tags=["history"])
+        self.router.add_api_route("/{device_id}/export", self.export, methods=["GET"])
+        self.router.add_api_route("/{device_id}/aggregate", self.aggregate, response_class=JSONResponse, methods=["GET"])
+        self.database_manager = database_manager
+        self.history_store = history_store
+        self.chunk_size = chunk_size  # klein halten: erstes Byte kommt nach dem ersten Block
+
+    async def export(self, device_id: str, format: str = "csv", start: Optional[str] = None, end: Optional[str] = None):
+        """
+        Stream the value history of a device as CSV or NDJSON (server-side cursor, flat memory)
+        """
+        if format not in MEDIA_TYPES:
+            raise HTTPException(status_code=400, detail=f"Unknown format {format}, use csv or ndjson")
+        try:
+            start_time, end_time = parse_time(start), parse_time(end)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid timestamp: {e}")
+
+        chunks = export_chunks(self.database_manager, "values", start_time, end_time, device_id, self.chunk_size)
+        encode = encode_csv if format == "csv" else encode_ndjson
+        texts = encode(TABLES["values"].columns, chunks)
+
+        async def stream():
+            # der Cursor läuft im Threadpool, die Event-Schleife wird nicht blockiert
+            try:
+                async for text in iterate_in_threadpool(texts):
+                    yield text
+            finally:
+                # bei Abbruch durch den Client Cursor und Verbindung freigeben
+                await run_in_threadpool(texts.close)
+                await run_in_threadpool(chunks.close)
+
+        filename = f"{device_id}.{format}"
+        return StreamingResponse(stream(), media_type=MEDIA_TYPES[format],
+                                 headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+    async def aggregate(self, device_id: str, bucket: int = 3600, start: Optional[str] = None, end: Optional[str] = None):
+        """
+        Count/min/max/avg per time bucket (seconds); computed by the DuckDB history store if configured
+        """
+        if bucket <= 0:
+            raise HTTPException(status_code=400, detail="bucket must be positive")
+        try:
+            start_time, end_time = parse_time(start), parse_time(end)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid timestamp: {e}")
+
+        if self.history_store is not None:
+            return await run_in_threadpool(self.history_store.aggregate, device_id, bucket, start_time, end_time)
+
+        def aggregate():
+            return aggregate_rows(export_chunks(self.database_manager, "values", start_time, end_time, device_id), bucket)
+        return await run_in_threadpool(aggregate)
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy import desc
-from models.log import Log
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from core.crud import read_last_log_rows, search_log_rows
+from core.history_io import parse_time
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,6 +14,7 @@ class Protocol:
     def __init__(self, websocket_manager, database_manager,  templates: Jinja2Templates):
         self.router = APIRouter(prefix="/protocol", tags=["protocol"])
         self.router.add_api_route("/", self.protocol, response_class=HTMLResponse, methods=["GET"])
+        self.router.add_api_route("/search", self.search, response_class=JSONResponse, methods=["GET"])
         self.router.add_api_websocket_route("/ws", self.protocol_websocket)
         self.websocket_manager = websocket_manager
         self.database_manager = database_manager
@@ -20,28 +23,50 @@ class Protocol:
     async def protocol(self, request: Request):
         return self.templates.TemplateResponse("protocol.html", {"request": request})
 
+    async def search(self, q: Optional[str] = None, contains: Optional[str] = None,
+                     protocol: Optional[List[str]] = Query(None), level: Optional[List[str]] = Query(None),
+                     ref_id: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None,
+                     limit: int = 100):
+        """
+        Search the protocol, newest first: `q` = all words (full-text), `contains` = substring (min. 3 characters),
+        combined with protocol, level (both repeatable), ref_id and start/end
+        """
+        if contains is not None and len(contains) < 3:
+            # kürzere Muster kann der Trigramm-Index nicht nutzen -> Sequential Scan
+            raise HTTPException(status_code=400, detail="contains needs at least 3 characters")
+        if not 0 < limit <= 1000:
+            raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
+        try:
+            start_time, end_time = parse_time(start), parse_time(end)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid timestamp: {e}")
+
+        def search():
+            with self.database_manager.read_scope() as db:
+                return search_log_rows(db, q, contains, protocol, level, ref_id, start_time, end_time, limit)
+        entries = await run_in_threadpool(search)
+        return {"count": len(entries), "entries": entries}
+
     async def protocol_websocket(self, websocket: WebSocket):
         """
         WebSocket endpoint for real-time protocol updates
         """
-        await self.websocket_manager.connect_protocol(websocket)
+        if not await self.websocket_manager.connect_protocol(websocket):
+            return
 
         try:
             # Send initial data (last 20 entries)
-            with self.database_manager.session_scope() as db:
-                initial_entries = db.query(Log).order_by(desc(Log.timestamp)).limit(20).all()
-                initial_data = [entry.to_json() for entry in initial_entries]
+            with self.database_manager.read_scope() as db:
+                initial_data = read_last_log_rows(db, 20)
 
-                await self.websocket_manager.send_initial_protocol_data(websocket, initial_data)
+            await self.websocket_manager.send_initial_protocol_data(websocket, initial_data)
 
-            # Keep connection alive and handle client messages
+            # Keep connection alive and handle client messages (pongs are handled by the manager)
             while True:
-                try:
-                    # Wait for client messages (e.g., ping/pong)
-                    data = await websocket.receive_text()
-                    logger.debug(f"Received protocol websocket message: {data}")
-                except WebSocketDisconnect:
+                data = await self.websocket_manager.receive("protocol", websocket)
+                if data is None:
                     break
+                logger.debug(f"Received protocol websocket message: {data}")
 
         except Exception as e:
             logger.error(f"Protocol WebSocket error: {e}")
@@ -0,0 +1,101 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from starlette.concurrency import run_in_threadpool
+from typing import Callable, Hashable, Optional
+import logging
+
+from core.change_tracker import ChangeTracker
+from core.crud import read_alarm_rows, read_last_log_rows
+from core.database_manager import DatabaseManager
+from services.device_service import DeviceService
+
+logger = logging.getLogger(__name__)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match with one or more (weak) ETags or *"""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+class RestApi:
+    """
+    Versioned JSON API for polling clients. Every response carries an ETag from the
+    in-memory change counter; If-None-Match is answered with 304 before any database
+    access, unchanged responses are served from the per-version cache.
+    """
+
+    def __init__(self, device_service: DeviceService, database_manager: DatabaseManager,
+                 change_tracker: ChangeTracker, max_protocol_entries: int = 500):
+        self.router = APIRouter(prefix="/api/v1", tags=["api"])
+        self.router.add_api_route("/values", self.values, methods=["GET"])
+        self.router.add_api_route("/values/{device_id}", self.value, methods=["GET"])
+        self.router.add_api_route("/alarms", self.alarms, methods=["GET"])
+        self.router.add_api_route("/protocol", self.protocol, methods=["GET"])
+        self.device_service = device_service
+        self.database_manager = database_manager
+        self.change_tracker = change_tracker
+        self.max_protocol_entries = max_protocol_entries
+
+    async def _respond(self, request: Request, topic: str, key: Hashable, build: Callable[[], object],
+                       in_threadpool: bool = False) -> Response:
+        etag = self.change_tracker.etag(topic)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+
+        if in_threadpool:
+            body = await run_in_threadpool(self.change_tracker.cached, topic, key, build)
+        else:
+            body = self.change_tracker.cached(topic, key, build)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def values(self, request: Request, group_id: Optional[str] = None):
+        """
+        Current value of every device (optionally of one group), from the device index
+        """
+        if group_id is None:
+            build = self.device_service.get_current_values
+        else:
+            if self.device_service.get_group(group_id) is None:
+                raise HTTPException(status_code=404, detail=f"Unknown group {group_id}")
+
+            def build():
+                return [entry for entry in self.device_service.get_current_values() if entry["group_id"] == group_id]
+        return await self._respond(request, "values", ("values", group_id), build)
+
+    async def value(self, request: Request, device_id: str):
+        """
+        Current value of one device
+        """
+        entry = self.device_service.current_entries.get(device_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail=f"No value for device {device_id}")
+        return await self._respond(request, "values", ("value", device_id), lambda: entry)
+
+    async def alarms(self, request: Request, active: Optional[bool] = None):
+        """
+        All alarms sorted by priority and timestamp, optionally only (in)active ones
+        """
+        def build():
+            # Primary statt Replika: nach einer Änderung darf kein alter Stand unter der neuen Version landen
+            with self.database_manager.session_scope() as db:
+                alarms = read_alarm_rows(db)
+            if active is None:
+                return alarms
+            return [alarm for alarm in alarms if alarm["active"] == active]
+        return await self._respond(request, "alarms", active, build, in_threadpool=True)
+
+    async def protocol(self, request: Request, limit: int = 20):
+        """
+        Latest protocol entries, newest first
+        """
+        if not 0 < limit <= self.max_protocol_entries:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {self.max_protocol_entries}")
+
+        def build():
+            with self.database_manager.session_scope() as db:
+                return read_last_log_rows(db, limit)
+        return await self._respond(request, "logs", limit, build, in_threadpool=True)
@@ -0,0 +1,72 @@
+"""
+Bulk import and export of historical values and logs.
+
+Imports stream CSV/JSONL/Parquet files in chunks (PostgreSQL: COPY into a staging
+table, existing rows are skipped), exports stream a time range with a server-side
+cursor. Memory stays bounded by --chunk-size in both directions.
+
+    cd app; python bulk.py import values history.csv
+    cd app; python bulk.py import logs logs.jsonl --chunk-size 50000
+    cd app; python bulk.py export values values-2024.parquet --start 2024-01-01 --end 2025-01-01
+    cd app; python bulk.py export logs - --device sensor_temp_01 --format jsonl
+
+Parquet needs pyarrow. The database is taken from DATABASE_URL or --database-url.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+
+def parse_args(argv=None):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--database-url", help="Database URL (default: DATABASE_URL)")
+    common.add_argument("--chunk-size", type=int, default=10000, help="Rows per chunk")
+    common.add_argument("--format", choices=["csv", "jsonl", "parquet"], help="File format (default: from extension)")
+
+    parser = argparse.ArgumentParser(description="Bulk import/export of values and logs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", parents=[common], help="Import a file into values or logs")
+    import_parser.add_argument("table", choices=["values", "logs"])
+    import_parser.add_argument("path")
+
+    export_parser = commands.add_parser("export", parents=[common], help="Export values or logs to a file")
+    export_parser.add_argument("table", choices=["values", "logs"])
+    export_parser.add_argument("path", help='Output file, "-" for stdout (CSV/JSONL)')
+    export_parser.add_argument("--start", help="ISO timestamp, inclusive")
+    export_parser.add_argument("--end", help="ISO timestamp, exclusive")
+    export_parser.add_argument("--device", help="Device id (values.id / logs.ref_id)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+                        stream=sys.stderr)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    from core.database_manager import DatabaseManager
+    from core.history_io import export_chunks, format_for, import_chunks, read_file, write_file
+
+    database_manager = DatabaseManager(args.database_url)
+    fmt = format_for(args.path, args.format)
+    started = time.perf_counter()
+
+    if args.command == "import":
+        stats = import_chunks(database_manager, args.table, read_file(args.path, fmt, args.chunk_size))
+        elapsed = time.perf_counter() - started
+        print(f"{stats['read']} rows read, {stats['inserted']} inserted, {stats['skipped']} skipped "
+              f"in {elapsed:.1f}s ({stats['read'] / elapsed if elapsed else 0:.0f} rows/s)", file=sys.stderr)
+    else:
+        if fmt == "parquet" and args.path == "-":
+            raise SystemExit("Parquet cannot be written to stdout")
+        chunks = export_chunks(database_manager, args.table, args.start, args.end, args.device, args.chunk_size)
+        count = write_file(args.path, fmt, args.table, chunks)
+        elapsed = time.perf_counter() - started
+        print(f"{count} rows exported in {elapsed:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import asyncio
+import logging
+import string
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .crud import read_active_alarms, read_alarm_rules
+from .database_manager import DatabaseManager
+from .event_handler import EventHandler
+from .event_type import EventType
+
+
+logger = logging.getLogger(__name__)
+
+
+THRESHOLD_ABOVE = "threshold_above"
+THRESHOLD_BELOW = "threshold_below"
+RATE_OF_CHANGE = "rate_of_change"  # threshold = maximale Änderung pro Minute
+STALE = "stale"  # timeout = Sekunden ohne neuen Wert
+
+DEFAULT_MESSAGES = {
+    THRESHOLD_ABOVE: "{device_id}: Wert {value} über Grenzwert {threshold}",
+    THRESHOLD_BELOW: "{device_id}: Wert {value} unter Grenzwert {threshold}",
+    RATE_OF_CHANGE: "{device_id}: Wert ändert sich zu schnell ({previous} -> {value})",
+    STALE: "{device_id}: keine Werte seit {timeout} s",
+}
+
+MESSAGE_FIELDS = {"device_id", "value", "previous", "threshold", "timeout"}
+
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _overlaps(value_types: Set[Optional[str]], value_type: Optional[str]) -> bool:
+    """Whether a rule for value_type (None = all) covers a value type already in the set"""
+    return bool(value_types) and (value_type is None or None in value_types or value_type in value_types)
+
+
+def _check_message(message: str):
+    """ValueError for malformed templates and placeholders format() does not provide"""
+    for _, field, _, _ in string.Formatter().parse(message):
+        if field is None:
+            continue
+        name = field.split(".", 1)[0].split("[", 1)[0]
+        if name not in MESSAGE_FIELDS:
+            raise ValueError(f"Unknown placeholder {{{field}}} in message, use {', '.join(sorted(MESSAGE_FIELDS))}")
+
+
+def _timestamp(value) -> Optional[datetime]:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class CompiledRule:
+    """An alarm rule compiled once into a bound evaluation function"""
+
+    __slots__ = ("device_id", "value_type", "rule_type", "threshold", "hysteresis", "timeout",
+                 "alarm_type", "message", "priority", "evaluate")
+
+    def __init__(self, rule: dict):
+        self.device_id = rule.get("device_id")
+        self.value_type = rule.get("value_type")
+        self.rule_type = rule["rule_type"]
+        self.threshold = rule.get("threshold")
+        self.hysteresis = rule.get("hysteresis") or 0.0
+        self.timeout = rule.get("timeout")
+        self.alarm_type = rule["alarm_type"]
+        self.message = rule.get("message") or DEFAULT_MESSAGES[self.rule_type]
+        self.priority = rule.get("priority") or 0
+
+        evaluators = {
+            THRESHOLD_ABOVE: self._above,
+            THRESHOLD_BELOW: self._below,
+            RATE_OF_CHANGE: self._rate_of_change,
+            STALE: self._fresh,
+        }
+        if self.rule_type not in evaluators:
+            raise ValueError(f"Unknown alarm rule type {self.rule_type}")
+        if self.rule_type == STALE and not self.timeout:
+            raise ValueError(f"Stale rule {self.alarm_type} needs a timeout")
+        if self.rule_type == STALE and self.device_id is None and self.value_type is None:
+            raise ValueError(f"Stale rule {self.alarm_type} needs a device_id or value_type")
+        if self.rule_type != STALE and self.threshold is None:
+            raise ValueError(f"Rule {self.alarm_type} needs a threshold")
+        _check_message(self.message)
+        self.evaluate = evaluators[self.rule_type]
+
+    # evaluate(active, value, previous, elapsed) -> neuer Zustand
+    def _above(self, active: bool, value: Optional[float], previous: Optional[float], elapsed: Optional[float]) -> bool:
+        if value is None:
+            return active
+        return value > self.threshold - self.hysteresis if active else value > self.threshold
+
+    def _below(self, active: bool, value: Optional[float], previous: Optional[float], elapsed: Optional[float]) -> bool:
+        if value is None:
+            return active
+        return value < self.threshold + self.hysteresis if active else value < self.threshold
+
+    def _rate_of_change(self, active: bool, value: Optional[float], previous: Optional[float], elapsed: Optional[float]) -> bool:
+        if value is None or previous is None or not elapsed or elapsed <= 0:
+            return active
+        rate = abs(value - previous) / elapsed * 60
+        return rate > self.threshold - self.hysteresis if active else rate > self.threshold
+
+    def _fresh(self, active: bool, value: Optional[float], previous: Optional[float], elapsed: Optional[float]) -> bool:
+        return False  # ein neuer Wert beendet den Stale-Alarm
+
+    def matches(self, value_type: str) -> bool:
+        return self.value_type is None or self.value_type == value_type
+
+    def format(self, device_id: str, value, previous) -> str:
+        fields = dict(device_id=device_id, value=value, previous=previous, threshold=self.threshold,
+                      timeout=self.timeout)
+        try:
+            return self.message.format(**fields)
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError) as e:
+            # z. B. Formatangabe {value:.1f} für einen Text-Wert: Standardmeldung statt Abbruch des Consumers
+            logger.error(f"Alarm message of {self.alarm_type} failed for {device_id}: {e!r}")
+            return DEFAULT_MESSAGES[self.rule_type].format(**fields)
+
+
+class AlarmEngine(EventHandler):
+    """
+    Evaluates declarative alarm rules against incoming values in-process.
+
+    Rules are compiled once and indexed by device id (rules without device id by
+    value type); the matching rule list per (device, value type) is cached. The
+    latest sample and the alarm state are kept in memory, so evaluation needs no
+    database access. State changes are emitted as ALARM events.
+    Alarms are stored per (device_id, alarm_type), so at most one rule per alarm type
+    may apply to a device; overlapping rules are rejected in load().
+    """
+
+    def __init__(self, queue: asyncio.Queue, database_manager: DatabaseManager):
+        self.queue = queue
+        self.database_manager = database_manager
+        self.rules_by_device: Dict[str, List[CompiledRule]] = {}
+        self.rules_by_type: Dict[Optional[str], List[CompiledRule]] = {}
+        self.stale_rules: List[CompiledRule] = []
+        self._rules_for: Dict[Tuple[str, str], List[CompiledRule]] = {}
+        self.samples: Dict[Tuple[str, str], Tuple[Optional[float], Optional[datetime]]] = {}
+        self.last_seen: Dict[str, float] = {}  # monotonic, für Stale-Regeln
+        self.devices_by_type: Dict[str, Set[str]] = {}
+        self.active: Dict[Tuple[str, str], bool] = {}  # (device_id, alarm_type) wie in der alarms-Tabelle
+        self.evaluations = 0
+        self.transitions = 0
+
+    def load(self, plugin_rules: Iterable[dict] = ()):
+        """Compile the rules from the database and the plugins, restore active alarms"""
+        with self.database_manager.session_scope() as db:
+            rules = [rule.to_json() for rule in read_alarm_rules(db)]
+            active = [(alarm.device_id, alarm.alarm_type) for alarm in read_active_alarms(db)]
+
+        self.rules_by_device.clear()
+        self.rules_by_type.clear()
+        self.stale_rules.clear()
+        self._rules_for.clear()
+
+        # je alarm_type: Wertetypen der Geräteregeln pro Gerät, aller Geräteregeln und der Typregeln
+        scopes: Dict[str, Tuple[Dict[str, Set[Optional[str]]], Set[Optional[str]], Set[Optional[str]]]] = {}
+        count = 0
+        for rule in [*rules, *plugin_rules]:
+            try:
+                compiled = CompiledRule(rule)
+            except (KeyError, ValueError) as e:
+                logger.error(f"Skipping invalid alarm rule {rule}: {e}")
+                continue
+
+            by_device, device_types, type_rules = scopes.setdefault(compiled.alarm_type, ({}, set(), set()))
+            if compiled.device_id is not None:
+                overlap = _overlaps(by_device.get(compiled.device_id, set()), compiled.value_type)
+            else:
+                overlap = _overlaps(device_types, compiled.value_type)
+            if overlap or _overlaps(type_rules, compiled.value_type):
+                # beide Regeln würden denselben Alarm (device_id, alarm_type) setzen und sich gegenseitig aufheben
+                logger.error(f"Skipping alarm rule {rule}: another rule already raises {compiled.alarm_type} "
+                             f"for the same device and value type, use a distinct alarm_type")
+                continue
+            if compiled.device_id is not None:
+                by_device.setdefault(compiled.device_id, set()).add(compiled.value_type)
+                device_types.add(compiled.value_type)
+            else:
+                type_rules.add(compiled.value_type)
+            if compiled.device_id is not None:
+                self.rules_by_device.setdefault(compiled.device_id, []).append(compiled)
+                self.last_seen.setdefault(compiled.device_id, time.monotonic())
+            else:
+                self.rules_by_type.setdefault(compiled.value_type, []).append(compiled)
+            if compiled.rule_type == STALE:
+                self.stale_rules.append(compiled)
+            count += 1
+
+        self.active = {key: True for key in active}
+        logger.info(f"Alarm engine loaded {count} rules, {len(self.active)} active alarms")
+
+    def active_devices(self, alarm_type: str) -> List[str]:
+        """Devices with an active alarm of this type (restored from the database in load())"""
+        return [device_id for (device_id, active_type), active in self.active.items()
+                if active and active_type == alarm_type]
+
+    def rules_for(self, device_id: str, value_type: str) -> List[CompiledRule]:
+        key = (device_id, value_type)
+        rules = self._rules_for.get(key)
+        if rules is None:
+            candidates = [*self.rules_by_device.get(device_id, ()), *self.rules_by_type.get(value_type, ()),
+                          *(self.rules_by_type.get(None, ()) if value_type is not None else ())]
+            rules = [rule for rule in candidates if rule.matches(value_type)]
+            self._rules_for[key] = rules
+        return rules
+
+    async def handle(self, event_type: EventType, payload: dict):
+
+        if event_type == EventType.VALUE:
+            await self.evaluate(payload)
+        elif event_type == EventType.VALUE_BATCH:
+            for sample in payload.get("values", []):
+                await self.evaluate(sample)
+
+    async def evaluate(self, sample: dict):
+        device_id = sample.get("id")
+        value_type = sample.get("value_type")
+        rules = self.rules_for(device_id, value_type)
+        if not rules:
+            return
+
+        key = (device_id, value_type)
+        value = _number(sample.get("value"))
+        timestamp = _timestamp(sample.get("timestamp"))
+        previous, previous_timestamp = self.samples.get(key, (None, None))
+        self.samples[key] = (value, timestamp)
+        self.last_seen[device_id] = time.monotonic()
+        self.devices_by_type.setdefault(value_type, set()).add(device_id)
+
+        elapsed = None
+        if timestamp is not None and previous_timestamp is not None:
+            elapsed = (timestamp - previous_timestamp).total_seconds()
+
+        for rule in rules:
+            self.evaluations += 1
+            active = self.active.get((device_id, rule.alarm_type), False)
+            await self._set_active(rule, device_id, rule.evaluate(active, value, previous, elapsed),
+                                   sample.get("value"), previous)
+
+    async def check_stale(self):
+        """Raise stale alarms; runs as a scheduler job and only looks at stale rules"""
+        now = time.monotonic()
+        for rule in self.stale_rules:
+            device_ids = [rule.device_id] if rule.device_id else self.devices_by_type.get(rule.value_type, ())
+            for device_id in device_ids:
+                last_seen = self.last_seen.get(device_id)
+                if last_seen is not None and now - last_seen > rule.timeout:
+                    await self._set_active(rule, device_id, True, None, None)
+
+    async def _set_active(self, rule: CompiledRule, device_id: str, active: bool, value, previous):
+        key = (device_id, rule.alarm_type)
+        if self.active.get(key, False) == active:
+            return
+        self.active[key] = active
+        self.transitions += 1
+
+        message = rule.format(device_id, value, previous)
+        alarm_payload = {
+            "active": active,
+            "acknowledged": False,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "message": message if active else f"Aufgehoben: {message}",
+            "alarm_type": rule.alarm_type,
+            "device_id": device_id,
+            "priority": rule.priority
+        }
+        await self.queue.put((EventType.ALARM, alarm_payload))
+
+    def get_stats(self) -> dict:
+        return {
+            "rules": sum(len(rules) for rules in self.rules_by_device.values())
+            + sum(len(rules) for rules in self.rules_by_type.values()),
+            "active": sum(1 for active in self.active.values() if active),
+            "evaluations": self.evaluations,
+            "transitions": self.transitions
+        }
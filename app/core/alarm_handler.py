@@ -1,6 +1,8 @@
 import logging
+from typing import Optional
 
-from .crud import create_or_update_alarm, read_alarms, update_alarm_acknowledged
+from .change_tracker import ChangeTracker
+from .crud import create_or_update_alarm, read_alarm_rows, update_alarm_acknowledged
 from .event_handler import EventHandler
 from .event_type import EventType
 from .database_manager import DatabaseManager
@@ -15,9 +17,11 @@ logger = logging.getLogger(__name__)
 
 class AlarmHandler(EventHandler):
 
-    def __init__(self, database_manager: DatabaseManager, websocket_manager: WebSocketManager):
+    def __init__(self, database_manager: DatabaseManager, websocket_manager: WebSocketManager,
+                 change_tracker: Optional[ChangeTracker] = None):
         self.database_manager = database_manager
         self.websocket_manager = websocket_manager
+        self.change_tracker = change_tracker or ChangeTracker()
 
     async def handle(self, event_type: EventType, payload: dict):
 
@@ -36,7 +40,7 @@ class AlarmHandler(EventHandler):
                 update = True
 
         if update:  # broadcast update if there was a change
+            self.change_tracker.touch("alarms")
             with self.database_manager.session_scope() as db:
-                update_alarms = read_alarms(db)
-                update_data = [alarm.to_json() for alarm in update_alarms]
-                await self.websocket_manager.broadcast_alarm_update(update_data)
+                update_data = read_alarm_rows(db)
+            await self.websocket_manager.broadcast_alarm_update(update_data)
@@ -0,0 +1,43 @@
+import json
+import os
+from typing import Callable, Dict, Hashable, Tuple
+
+
+class ChangeTracker:
+    """
+    In-memory change counter per topic ("values", "alarms", "logs").
+
+    The handlers call touch() after every change; the REST API derives its ETags from
+    the counter and caches the encoded response per version, so unchanged polls
+    neither query the database nor encode JSON. The boot id keeps ETags from an
+    earlier process run from matching after a restart.
+    """
+
+    def __init__(self):
+        self.boot_id = os.urandom(4).hex()
+        self.versions: Dict[str, int] = {}
+        self._responses: Dict[Tuple[str, Hashable], Tuple[int, bytes]] = {}
+
+    def touch(self, topic: str):
+        self.versions[topic] = self.versions.get(topic, 0) + 1
+
+    def version(self, topic: str) -> int:
+        return self.versions.get(topic, 0)
+
+    def etag(self, topic: str) -> str:
+        return f'"{self.boot_id}-{topic}-{self.version(topic)}"'
+
+    def cached(self, topic: str, key: Hashable, build: Callable[[], object]) -> bytes:
+        """
+        JSON-encoded result of build() for the current version of the topic.
+
+        The version is taken before build() runs: a change during the build only
+        leads to a rebuild on the next request, never to a stale cached body.
+        """
+        version = self.version(topic)
+        entry = self._responses.get((topic, key))
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        body = json.dumps(build()).encode()
+        self._responses[(topic, key)] = (version, body)
+        return body
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from .event_handler import EventHandler
+from .event_type import EventType
+
+from services.device_service import DeviceService
+
+
+logger = logging.getLogger(__name__)
+
+
+class CommandManager(EventHandler):
+    """
+    Sends device commands through the event queue and correlates the plugin acknowledgements.
+
+    Every command gets a correlation id, the caller awaits the matching COMMAND_ACK
+    (or a timeout) and receives the end-to-end latency with the result.
+    """
+
+    def __init__(self, queue: asyncio.Queue, device_service: DeviceService, timeout: float = 5.0):
+        self.queue = queue
+        self.device_service = device_service
+        self.timeout = timeout
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.latencies = deque(maxlen=1000)  # ms, nur erfolgreich bestätigte Kommandos
+        self.sent = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    async def send(self, device_id: str, command: str, args: Optional[dict] = None, timeout: Optional[float] = None) -> dict:
+        """Send a command to the plugin owning the device and wait for its acknowledgement"""
+        device = self.device_service.get_device(device_id)
+        if device is None:
+            raise LookupError(f"Unknown device {device_id}")
+        if not device.get("plugin"):
+            raise LookupError(f"Device {device_id} is not controlled by a plugin")
+
+        correlation_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self.pending[correlation_id] = future
+        self.sent += 1
+
+        payload = {
+            "correlation_id": correlation_id,
+            "device_id": device_id,
+            "plugin": device["plugin"],
+            "command": command,
+            "args": args or {},
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+
+        started = time.perf_counter()
+        try:
+            await self.queue.put((EventType.COMMAND, payload))
+            ack = await asyncio.wait_for(future, timeout or self.timeout)
+            result = {
+                "status": ack.get("status"),
+                "result": ack.get("result"),
+                "error": ack.get("error")
+            }
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            result = {"status": "timeout", "result": None, "error": "No acknowledgement from plugin"}
+        finally:
+            self.pending.pop(correlation_id, None)
+
+        latency_ms = (time.perf_counter() - started) * 1000
+        if result["status"] == "ok":
+            self.latencies.append(latency_ms)
+        elif result["status"] == "error":
+            self.errors += 1
+
+        result.update({
+            "correlation_id": correlation_id,
+            "device_id": device_id,
+            "command": command,
+            "latency_ms": round(latency_ms, 3)
+        })
+        logger.info(f"Command {command} for {device_id}: {result['status']} after {latency_ms:.1f} ms")
+        await self.queue.put((EventType.LOG, {
+            "message": f"Kommando '{command}' an {device_id}: {result['status']} ({latency_ms:.0f} ms)",
+            "protocol": "DEVICE_CONTROL",
+            "level": "INFO" if result["status"] == "ok" else "WARNING",
+            "ref_id": device_id,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }))
+        return result
+
+    async def handle(self, event_type: EventType, payload: dict):
+
+        if event_type != EventType.COMMAND_ACK:
+            return
+
+        future = self.pending.get(payload.get("correlation_id"))
+        if future is None or future.done():
+            logger.warning(f"Late or unknown command acknowledgement: {payload}")
+            return
+        future.set_result(payload)
+
+    def get_stats(self) -> dict:
+        """Command counters and latency percentiles (ms)"""
+        latencies = sorted(self.latencies)
+
+        def percentile(p: float):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3)
+
+        return {
+            "sent": self.sent,
+            "pending": len(self.pending),
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "latency_ms": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(latencies[-1], 3) if latencies else None
+            }
+        }
@@ -0,0 +1,49 @@
+import os
+from typing import List, Optional
+
+
+class Config:
+    """Settings for create_app(); from_env() reads the environment variables used so far"""
+
+    def __init__(self, database_url: Optional[str] = None, read_database_urls: Optional[List[str]] = None,
+                 max_replica_lag: Optional[float] = None, duckdb_path: Optional[str] = None,
+                 templates_dir: str = "templates", static_dir: str = "static",
+                 startup_timeout: float = 60.0, startup_retry_interval: float = 2.0,
+                 admin_token: Optional[str] = None, ws_max_connections: int = 1000,
+                 ws_max_connections_per_client: int = 50, ws_heartbeat_interval: float = 20.0,
+                 ws_idle_timeout: float = 60.0):
+        self.database_url = database_url
+        self.read_database_urls = read_database_urls
+        self.max_replica_lag = max_replica_lag
+        self.duckdb_path = duckdb_path
+        self.templates_dir = templates_dir
+        self.static_dir = static_dir
+        self.startup_timeout = startup_timeout  # so lange wird beim Start auf die Datenbank gewartet
+        self.startup_retry_interval = startup_retry_interval
+        self.admin_token = admin_token  # ohne Token sind die Diagnose-Endpunkte abgeschaltet
+        self.ws_max_connections = ws_max_connections
+        # hinter einem Reverse Proxy teilen sich alle Browser eine Client-Adresse: dann hochsetzen
+        self.ws_max_connections_per_client = ws_max_connections_per_client
+        self.ws_heartbeat_interval = ws_heartbeat_interval
+        self.ws_idle_timeout = ws_idle_timeout
+        if ws_heartbeat_interval <= 0 or ws_idle_timeout <= ws_heartbeat_interval:
+            # sonst würde jeder Client zwischen zwei Pings als still geschlossen
+            raise ValueError(f"WS_IDLE_TIMEOUT ({ws_idle_timeout}) must be larger than "
+                             f"WS_HEARTBEAT_INTERVAL ({ws_heartbeat_interval}) and both positive")
+
+    @classmethod
+    def from_env(cls) -> "Config":
+        read_urls = os.getenv("READ_DATABASE_URLS")
+        max_lag = os.getenv("MAX_REPLICA_LAG")
+        return cls(
+            database_url=os.getenv("DATABASE_URL"),
+            read_database_urls=[url.strip() for url in read_urls.split(",") if url.strip()] if read_urls else None,
+            max_replica_lag=float(max_lag) if max_lag else None,
+            duckdb_path=os.getenv("DUCKDB_PATH") or None,
+            startup_timeout=float(os.getenv("STARTUP_TIMEOUT", "60")),
+            admin_token=os.getenv("ADMIN_TOKEN") or None,
+            ws_max_connections=int(os.getenv("WS_MAX_CONNECTIONS", "1000")),
+            ws_max_connections_per_client=int(os.getenv("WS_MAX_CONNECTIONS_PER_CLIENT", "50")),
+            ws_heartbeat_interval=float(os.getenv("WS_HEARTBEAT_INTERVAL", "20")),
+            ws_idle_timeout=float(os.getenv("WS_IDLE_TIMEOUT", "60")),
+        )
@@ -1,13 +1,27 @@
 import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy import desc, func, literal_column
 from models.value import Value
 from models.alarm import Alarm
 from models.log import Log
+from models.device import Device
+from models.device_group import DeviceGroup
+from models.value_filter import ValueFilterRule
+from models.alarm_rule import AlarmRule
+from .serialization import RowSerializer
 
 logger = logging.getLogger(__name__)
 
 
+# Read models: plain column tuples for read-only snapshots, no ORM instances
+_value_rows = RowSerializer(Value.id, Value.timestamp, Value.value_type, Value.value, Value.unit)
+_alarm_rows = RowSerializer(Alarm.id, Alarm.active, Alarm.acknowledged, Alarm.timestamp, Alarm.message,
+                            Alarm.alarm_type, Alarm.device_id, Alarm.priority)
+_log_rows = RowSerializer(Log.id, Log.timestamp, Log.message, Log.protocol, Log.level, Log.ref_id)
+
+
 # Logs
 def create_log(db: Session, new_log: Log):
     """
@@ -17,6 +31,50 @@ def create_log(db: Session, new_log: Log):
     db.commit()
 
 
+def read_last_log_rows(db: Session, limit: int = 20) -> List[Dict]:
+    """
+    Read the latest log entries as JSON-ready dicts.
+    """
+    return _log_rows(db.query(*_log_rows.columns).order_by(desc(Log.timestamp)).limit(limit))
+
+
+def _like_pattern(text: str) -> str:
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def search_log_rows(db: Session, text: Optional[str] = None, contains: Optional[str] = None,
+                    protocols: Optional[List[str]] = None, levels: Optional[List[str]] = None,
+                    ref_id: Optional[str] = None, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    limit: int = 100) -> List[Dict]:
+    """
+    Search log entries, newest first. `text` matches all words (full-text index under PostgreSQL,
+    LIKE per word otherwise), `contains` matches a substring case-insensitively (trigram index).
+    """
+    query = db.query(*_log_rows.columns)
+    if text:
+        if db.get_bind().dialect.name == "postgresql":
+            # muss zum Ausdruck von ix_logs_message_fts passen: to_tsvector('simple', message)
+            # match() würde `message @@ tsquery` erzeugen (Standard-Konfiguration, kein Index)
+            query = query.filter(func.to_tsvector(literal_column("'simple'"), Log.message).op("@@")(
+                func.plainto_tsquery(literal_column("'simple'"), text)))
+        else:
+            for word in text.split():
+                query = query.filter(Log.message.ilike(_like_pattern(word), escape="\\"))
+    if contains:
+        query = query.filter(Log.message.ilike(_like_pattern(contains), escape="\\"))
+    if protocols:
+        query = query.filter(Log.protocol.in_(protocols))
+    if levels:
+        query = query.filter(Log.level.in_(levels))
+    if ref_id is not None:
+        query = query.filter(Log.ref_id == ref_id)
+    if start is not None:
+        query = query.filter(Log.timestamp >= start)
+    if end is not None:
+        query = query.filter(Log.timestamp < end)
+    return _log_rows(query.order_by(desc(Log.timestamp), desc(Log.id)).limit(limit))
+
+
 # Values
 def create_or_update_value(db: Session, new_value: Value):
     """
@@ -31,6 +89,51 @@ def create_or_update_value(db: Session, new_value: Value):
         db.commit()
 
 
+def create_values(db: Session, new_values: List[Value]) -> List[Value]:
+    """
+    Bulk insert values with a single lookup for existing (id, timestamp) pairs.
+    Returns the values that were actually inserted.
+    """
+    if not new_values:
+        return []
+
+    def utc(timestamp):
+        # Spalte ist TIMESTAMP ohne Zeitzone (UTC): erst nach UTC umrechnen, dann den Offset entfernen
+        return timestamp.astimezone(timezone.utc).replace(tzinfo=None) if timestamp.tzinfo else timestamp
+
+    def key(value_id, timestamp):
+        return value_id, utc(timestamp)
+
+    timestamps = [utc(value.timestamp) for value in new_values]
+    existing = {
+        key(value_id, timestamp) for value_id, timestamp in db.query(Value.id, Value.timestamp).filter(
+            Value.id.in_({value.id for value in new_values}),
+            Value.timestamp >= min(timestamps),
+            Value.timestamp <= max(timestamps)
+        )
+    }
+
+    inserted = []
+    for value in new_values:
+        value_key = key(value.id, value.timestamp)
+        if value_key in existing:
+            logger.warning(f"Value with id {value.id} and timestamp {value.timestamp} already exists. Skip insert")
+            continue
+        existing.add(value_key)
+        inserted.append(value)
+
+    db.add_all(inserted)
+    db.commit()
+    return inserted
+
+
+def read_value_filters(db: Session):
+    """
+    Read all deadband / interval rules for values.
+    """
+    return db.query(ValueFilterRule).all()
+
+
 def read_value_or_null(db: Session, value_id: str):
     """
     Read the latest value for a given device ID, or return None if not found.
@@ -56,6 +159,22 @@ def read_current_values(db: Session):
     ).all()
 
 
+def read_current_value_rows(db: Session) -> List[Dict]:
+    """
+    Current value per device as JSON-ready dicts (same query as read_current_values).
+    """
+    latest_timestamps = db.query(
+        Value.id,
+        func.max(Value.timestamp).label('latest_timestamp')
+    ).group_by(Value.id).subquery()
+
+    return _value_rows(db.query(*_value_rows.columns).join(
+        latest_timestamps,
+        (Value.id == latest_timestamps.c.id) &
+        (Value.timestamp == latest_timestamps.c.latest_timestamp)
+    ))
+
+
 # Alarms
 def create_or_update_alarm(db: Session, new_alarm):
     """
@@ -96,3 +215,80 @@ def read_alarms(db: Session):
     Read all alarms from the database.
     """
     return db.query(Alarm).order_by(desc(Alarm.priority), desc(Alarm.timestamp)).all()
+
+
+def read_alarm_rows(db: Session) -> List[Dict]:
+    """
+    Read all alarms as JSON-ready dicts, sorted like read_alarms.
+    """
+    return _alarm_rows(db.query(*_alarm_rows.columns).order_by(desc(Alarm.priority), desc(Alarm.timestamp)))
+
+
+def read_active_alarms(db: Session):
+    """
+    Read all currently active alarms.
+    """
+    return db.query(Alarm).filter_by(active=True).all()
+
+
+# Alarm rules
+def read_alarm_rules(db: Session):
+    """
+    Read all enabled alarm rules.
+    """
+    return db.query(AlarmRule).filter_by(enabled=True).all()
+
+
+# Devices
+def read_devices(db: Session):
+    """
+    Read all registered devices.
+    """
+    return db.query(Device).order_by(Device.id).all()
+
+
+def read_device_groups(db: Session):
+    """
+    Read all device groups ordered for display.
+    """
+    return db.query(DeviceGroup).order_by(DeviceGroup.sort_order, DeviceGroup.name).all()
+
+
+def create_or_update_devices(db: Session, devices: List[Dict]):
+    """
+    Create or update several devices in one transaction (one lookup query).
+    """
+    ids = [device["id"] for device in devices]
+    existing_devices = {}
+    for start in range(0, len(ids), 500):  # IN-Listen begrenzen (SQLite Parameterlimit)
+        for device in db.query(Device).filter(Device.id.in_(ids[start:start + 500])):
+            existing_devices[device.id] = device
+    for data in devices:
+        device = existing_devices.get(data["id"])
+        if device is None:
+            db.add(Device.from_dict(dict(data)))
+        else:
+            device.name = data["name"]
+            device.device_type = data["device_type"]
+            device.group_id = data["group_id"]
+            device.plugin = data["plugin"]
+            device.report_interval = data.get("report_interval")
+    db.commit()
+
+
+def create_or_update_device(db: Session, new_device: Device):
+    """
+    Create a new device or update an existing one based on id.
+    """
+    existing_device = db.query(Device).filter_by(id=new_device.id).one_or_none()
+
+    if existing_device:
+        existing_device.name = new_device.name
+        existing_device.device_type = new_device.device_type
+        existing_device.group_id = new_device.group_id
+        existing_device.plugin = new_device.plugin
+        existing_device.report_interval = new_device.report_interval
+        db.add(existing_device)
+    else:
+        db.add(new_device)
+    db.commit()
@@ -1,27 +1,138 @@
+import itertools
+import logging
 import os
+import time
 from contextlib import contextmanager
-from sqlalchemy import create_engine
+from typing import Dict, List, Optional
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session, declarative_base
 
 # Import model
 
 Base = declarative_base()
 
+logger = logging.getLogger(__name__)
+
+
+# Embedded-Betrieb: WAL erlaubt Lesen während geschrieben wird, synchronous=NORMAL reicht mit WAL
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": "5000",
+    "temp_store": "MEMORY",
+    "cache_size": "-65536",  # 64 MiB
+    "mmap_size": "268435456",  # 256 MiB
+    "foreign_keys": "ON",
+}
+
+# Embedded-Betrieb ohne Liquibase: create_all legt keine Spalten in vorhandenen Tabellen an.
+# Je Spalte Typ und Ausdruck zum Nachfüllen vorhandener Zeilen
+SQLITE_ADDED_COLUMNS = {
+    # Gerätezeitstempel, höchstens jetzt: eine vorgehende Geräteuhr darf das Wasserzeichen nicht in die Zukunft legen
+    "values": {"inserted_at": ("DATETIME", "min(timestamp, strftime('%Y-%m-%d %H:%M:%f000', 'now'))")},
+}
+
+
+def _create_engine(url: str, **kwargs) -> Engine:
+    """create_engine with tuned pragmas for SQLite files (embedded mode)"""
+    if not url.startswith("sqlite"):
+        return create_engine(url, echo=False, **kwargs)
+
+    engine = create_engine(url, echo=False, connect_args={"check_same_thread": False}, **kwargs)
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+    return engine
+
+
+def _add_sqlite_columns(engine: Engine):
+    """Add columns introduced after the SQLite file was created (indexes from the models included)"""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table_name, columns in SQLITE_ADDED_COLUMNS.items():
+            existing = {column["name"] for column in inspector.get_columns(table_name)}
+            for column, (column_type, backfill) in columns.items():
+                if column not in existing:
+                    logger.info(f"Adding column {table_name}.{column}")
+                    connection.execute(text(f'ALTER TABLE "{table_name}" ADD COLUMN {column} {column_type}'))
+                    connection.execute(text(f'UPDATE "{table_name}" SET {column} = {backfill} WHERE {column} IS NULL'))
+        for table_name in SQLITE_ADDED_COLUMNS:
+            for index in Base.metadata.tables[table_name].indexes:
+                index.create(connection, checkfirst=True)
+
+
+class Replica:
+    """A read-only engine with its last measured replication lag"""
+
+    def __init__(self, url: str):
+        self.engine = _create_engine(url, pool_pre_ping=True)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.lag: Optional[float] = None  # Sekunden, None = noch nicht gemessen
+        self.healthy = True
+        self.error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+        self.reads = 0
+
+    def to_json(self):
+        return {
+            "url": self.engine.url.render_as_string(hide_password=True),
+            "healthy": self.healthy,
+            "lag": self.lag,
+            "error": self.error,
+            "checked_ago": round(time.monotonic() - self.checked_at, 1) if self.checked_at else None,
+            "reads": self.reads
+        }
+
 
 class DatabaseManager:
-    def __init__(self, database_url: str = None):
+    """
+    Primary engine for writes plus optional read replicas (READ_DATABASE_URLS, comma separated).
+    A sqlite:/// URL runs the database embedded in the process (WAL, see SQLITE_PRAGMAS).
+
+    read_scope() hands out sessions on a healthy replica (round robin) and falls back
+    to the primary when there is none. Code that has to see its own writes keeps
+    using session_scope().
+    Engines are created and the schema is checked on connect(), which runs on first
+    use at the latest, so creating a DatabaseManager never touches the database.
+    """
+
+    def __init__(self, database_url: str = None, read_database_urls: List[str] = None, max_replica_lag: float = None):
         self.database_url = database_url or os.getenv(
             "DATABASE_URL", "postgresql://postgres:postgres@db:5432/haussteuerung"
         )
-        self.engine = create_engine(self.database_url, echo=False)
+        if read_database_urls is None:
+            read_database_urls = [url.strip() for url in os.getenv("READ_DATABASE_URLS", "").split(",") if url.strip()]
+        self.read_database_urls = read_database_urls
+        self.max_replica_lag = max_replica_lag if max_replica_lag is not None else float(os.getenv("MAX_REPLICA_LAG", "30"))
+        self.engine: Optional[Engine] = None
+        self.SessionLocal = None
+        self.replicas: List[Replica] = []
+        self._next_replica = itertools.count()
+
+    def connect(self):
+        """Create the engines and the tables (idempotent)"""
+        if self.engine is not None:
+            return
+        engine = _create_engine(self.database_url)
+        Base.metadata.create_all(bind=engine)  # optional: Tabellen erstellen
+        if engine.dialect.name == "sqlite":
+            _add_sqlite_columns(engine)
         self.SessionLocal = sessionmaker(
-            autocommit=False, autoflush=False, bind=self.engine
+            autocommit=False, autoflush=False, bind=engine
         )
-        Base.metadata.create_all(bind=self.engine)  # optional: Tabellen erstellen
+        self.replicas = [Replica(url) for url in self.read_database_urls]
+        self.engine = engine
 
     @contextmanager
     def session_scope(self):
         """Contextmanager für eine saubere DB-Session"""
+        self.connect()
         session: Session = self.SessionLocal()
         try:
             yield session
@@ -31,3 +142,57 @@ class DatabaseManager:
             raise
         finally:
             session.close()
+
+    def _pick_replica(self) -> Optional[Replica]:
+        self.connect()
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        replica = healthy[next(self._next_replica) % len(healthy)]
+        replica.reads += 1
+        return replica
+
+    def read_engine(self) -> Engine:
+        """Engine for read-only queries (replica if available, else primary)"""
+        replica = self._pick_replica()
+        return replica.engine if replica is not None else self.engine
+
+    @contextmanager
+    def read_scope(self):
+        """Read-only session on a replica (falls back to the primary); never commits"""
+        replica = self._pick_replica()
+        session: Session = replica.SessionLocal() if replica is not None else self.SessionLocal()
+        try:
+            yield session
+        finally:
+            session.rollback()
+            session.close()
+
+    def check_replicas(self):
+        """Measure the replication lag of every replica; replicas lagging more than max_replica_lag are skipped"""
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as connection:
+                    if connection.dialect.name == "postgresql":
+                        # 0 wenn alles eingespielt ist, sonst Alter der letzten eingespielten Transaktion
+                        lag = connection.execute(text(
+                            "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                            "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+                        )).scalar()
+                    else:
+                        connection.execute(text("SELECT 1"))
+                        lag = 0
+                replica.lag = float(lag) if lag is not None else 0.0  # NULL: kein Standby, z.B. Kopie der Primary
+                replica.error = None
+                replica.healthy = replica.lag <= self.max_replica_lag
+            except Exception as e:
+                replica.lag = None
+                replica.error = str(e)
+                replica.healthy = False
+            replica.checked_at = time.monotonic()
+            if not replica.healthy:
+                logger.warning(f"Read replica {replica.engine.url.render_as_string(hide_password=True)} not used: "
+                               f"lag {replica.lag}, error {replica.error}")
+
+    def get_replica_stats(self) -> List[Dict]:
+        return [replica.to_json() for replica in self.replicas]
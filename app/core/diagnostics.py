@@ -0,0 +1,156 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame) -> List[str]:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_name(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread (the event loop) from a background thread.
+
+    Stdlib only and without tracing hooks, so the profiled code runs at full speed;
+    the result is in collapsed-stack format ("a;b;c count") for flame graph tools
+    such as speedscope or flamegraph.pl.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+
+    def run(self, seconds: float) -> Counter:
+        """Blocking; call from a worker thread"""
+        samples = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                samples[";".join(_stack(frame))] += 1
+            time.sleep(self.interval)
+        return samples
+
+    @staticmethod
+    def collapsed(samples: Counter) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+    @staticmethod
+    def top(samples: Counter, limit: int = 30) -> Dict:
+        """Functions by self and total samples"""
+        own = Counter()
+        total = Counter()
+        for stack, count in samples.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for name in set(frames):
+                total[name] += count
+        return {
+            "samples": sum(samples.values()),
+            "self": [{"function": name, "samples": count} for name, count in own.most_common(limit)],
+            "total": [{"function": name, "samples": count} for name, count in total.most_common(limit)]
+        }
+
+
+def dump_tasks(limit: int = 20) -> List[Dict]:
+    """All asyncio tasks of the running loop with state and (truncated) stack"""
+    tasks = []
+    for task in asyncio.all_tasks():
+        frames = task.get_stack(limit=limit)
+        tasks.append({
+            "name": task.get_name(),
+            "coro": getattr(task.get_coro(), "__qualname__", repr(task.get_coro())),
+            "done": task.done(),
+            "cancelled": task.cancelled(),
+            "stack": [f"{frame.f_code.co_name} ({frame.f_code.co_filename}:{frame.f_lineno})" for frame in frames]
+        })
+    return sorted(tasks, key=lambda task: task["name"])
+
+
+class LoopMonitor:
+    """
+    Detects callbacks blocking the event loop longer than `threshold` seconds.
+
+    A coroutine refreshes a heartbeat every `interval`; a watcher thread that sees
+    the heartbeat getting older than the threshold captures the loop thread's stack,
+    i.e. the code that is blocking right now. Can be started and stopped at runtime.
+    """
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.02, keep: int = 50):
+        self.threshold = threshold
+        self.interval = interval
+        self.events = deque(maxlen=keep)
+        self.max_lag = 0.0
+        self.running = False
+        self._heartbeat = time.monotonic()
+        self._thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+
+    async def _beat(self):
+        while self.running:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self.max_lag = max(self.max_lag, time.monotonic() - expected)
+            self._heartbeat = time.monotonic()
+
+    def _watch(self):
+        reported = None
+        while self.running:
+            time.sleep(self.interval)
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat
+            if blocked <= self.threshold:
+                continue
+            if reported != heartbeat:
+                reported = heartbeat  # pro Blockade ein Eintrag, Stack beim Erkennen
+                frame = sys._current_frames().get(self._thread_id)
+                self.events.append({
+                    "at": time.time(),
+                    "blocked_ms": round(blocked * 1000, 1),
+                    "stack": traceback.format_stack(frame) if frame is not None else []
+                })
+            else:
+                self.events[-1]["blocked_ms"] = round(blocked * 1000, 1)
+
+    def start(self):
+        """Start from within the event loop"""
+        if self.running:
+            return
+        self.running = True
+        self._thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._beat(), name="loop_monitor")
+        self._thread = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        await asyncio.to_thread(self._thread.join)
+
+    def to_json(self):
+        return {
+            "running": self.running,
+            "threshold_ms": self.threshold * 1000,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "events": list(self.events)
+        }
@@ -1,7 +1,9 @@
 import asyncio
 import logging
+import time
 from typing import List, Dict
 from .event_handler import EventHandler
+from .event_queue import EventQueue
 
 from core.event_type import EventType
 from plugins.plugin_manager import PluginManager
@@ -13,13 +15,15 @@ class EventManager:
     def __init__(
         self,
         stop_event: asyncio.Event,
-        queue: asyncio.Queue,
+        queue: EventQueue,
         plugin_manager: PluginManager
     ):
         self.stop_event = stop_event
         self.event_queue = queue
         self.plugin_manager = plugin_manager
         self.event_handlers: Dict[EventType, List[EventHandler]] = {}
+        self.handler_timing = False  # zur Laufzeit über die Diagnose schaltbar
+        self.handler_stats: Dict[str, Dict] = {}
 
     def register_event_handler(self, event_types: List[EventType], handler: EventHandler):
         for event_type in event_types:
@@ -30,12 +34,41 @@ class EventManager:
     async def handle_event(self, event_type: EventType, payload: dict):
         if event_type in self.event_handlers:
             for handler in self.event_handlers[event_type]:
-                await handler.handle(event_type, payload)
+                if self.handler_timing:
+                    started = time.perf_counter()
+                    await handler.handle(event_type, payload)
+                    self._record(type(handler).__name__, event_type, time.perf_counter() - started)
+                else:
+                    await handler.handle(event_type, payload)
+
+    def _record(self, name: str, event_type: EventType, duration: float):
+        key = f"{name}:{event_type.name}"
+        stats = self.handler_stats.get(key)
+        if stats is None:
+            stats = self.handler_stats[key] = {"count": 0, "total": 0.0, "max": 0.0}
+        stats["count"] += 1
+        stats["total"] += duration
+        stats["max"] = max(stats["max"], duration)
+
+    def get_handler_stats(self) -> List[Dict]:
+        """Time spent per handler and event type while handler_timing is on, slowest first"""
+        return sorted(({
+            "handler": key,
+            "count": stats["count"],
+            "total_ms": round(stats["total"] * 1000, 3),
+            "avg_ms": round(stats["total"] / stats["count"] * 1000, 3),
+            "max_ms": round(stats["max"] * 1000, 3)
+        } for key, stats in self.handler_stats.items()), key=lambda entry: entry["total_ms"], reverse=True)
+
+    def get_queue_stats(self):
+        """Depth, throughput and worst queueing delay per priority lane"""
+        return self.event_queue.get_stats()
 
     async def run(self):
         while not self.stop_event.is_set():
             try:
                 # Timeout, damit wir regelmäßig stop_event prüfen
+                # get() liefert nach Priorität (Lanes), nicht streng FIFO
                 event, payload = await asyncio.wait_for(self.event_queue.get(), timeout=1.0)
             except asyncio.TimeoutError:
                 continue
@@ -44,6 +77,11 @@ class EventManager:
             await self.handle_event(event, payload)
 
             # redirect to Plugins (synchron)
-            await self.plugin_manager.trigger(event, payload)
+            if self.handler_timing:
+                started = time.perf_counter()
+                await self.plugin_manager.trigger(event, payload)
+                self._record("PluginManager", event, time.perf_counter() - started)
+            else:
+                await self.plugin_manager.trigger(event, payload)
 
             self.event_queue.task_done()
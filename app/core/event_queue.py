@@ -0,0 +1,158 @@
+import asyncio
+import time
+from collections import deque
+from typing import Dict, List, Tuple
+
+from .event_type import EventType
+
+
+CRITICAL_ALARM_PRIORITY = 2  # Alarme ab "hoch" laufen in der kritischen Lane
+
+
+class Lane:
+    """One FIFO lane of the event queue with its dequeue weight and counters"""
+
+    def __init__(self, name: str, weight: int):
+        self.name = name
+        self.weight = weight
+        self.items = deque()  # (enqueued_at, event_type, payload)
+        self.current = 0  # Zustand für smooth weighted round robin
+        self.last_served = time.monotonic()
+        self.enqueued = 0
+        self.dequeued = 0
+        self.max_wait = 0.0
+
+    def to_json(self):
+        return {
+            "name": self.name,
+            "weight": self.weight,
+            "depth": len(self.items),
+            "enqueued": self.enqueued,
+            "dequeued": self.dequeued,
+            "max_wait_ms": round(self.max_wait * 1000, 3)
+        }
+
+
+class EventQueue:
+    """
+    Priority-aware event queue.
+
+    Events are sorted into lanes by EventType (and alarm priority). The critical lane
+    (commands, alarm acknowledgements, high priority alarms) is served first; the
+    remaining lanes share the consumer by smooth weighted round robin. Two guards
+    prevent starvation: after `max_critical_burst` consecutive critical events one
+    regular event is served, and a lane that has not been served for `max_wait`
+    seconds is served next.
+    Drop-in replacement for the asyncio.Queue of (event_type, payload) tuples.
+    """
+
+    LANES = {
+        EventType.COMMAND: "critical",
+        EventType.COMMAND_ACK: "critical",
+        EventType.ALARM_ACKNOWLEDGE: "critical",
+        EventType.ALARM: "alarm",
+        EventType.START: "control",
+        EventType.STOP: "control",
+        EventType.CYCLE: "control",
+        EventType.POLL: "control",
+        EventType.VALUE: "value",
+        EventType.VALUE_CHANGED: "value",
+        EventType.VALUE_BATCH: "value",
+        EventType.LOG: "log",
+    }
+
+    WEIGHTS = {
+        "alarm": 8,
+        "control": 4,
+        "value": 2,
+        "log": 1,
+    }
+
+    def __init__(self, max_wait: float = 2.0, max_critical_burst: int = 32):
+        self.max_wait = max_wait
+        self.max_critical_burst = max_critical_burst
+        self.critical = Lane("critical", 0)
+        self.weighted: List[Lane] = [Lane(name, weight) for name, weight in self.WEIGHTS.items()]
+        self.lanes: Dict[str, Lane] = {lane.name: lane for lane in [self.critical, *self.weighted]}
+        self._available = asyncio.Semaphore(0)
+        self._size = 0
+        self._unfinished = 0
+        self._finished = asyncio.Event()
+        self._finished.set()
+        self._critical_burst = 0
+
+    def lane_for(self, event_type: EventType, payload: dict) -> Lane:
+        name = self.LANES.get(event_type, "control")
+        if name == "alarm" and (payload.get("priority") or 0) >= CRITICAL_ALARM_PRIORITY:
+            name = "critical"
+        return self.lanes[name]
+
+    def put_nowait(self, item: Tuple[EventType, dict]):
+        event_type, payload = item
+        lane = self.lane_for(event_type, payload)
+        lane.items.append((time.monotonic(), event_type, payload))
+        lane.enqueued += 1
+        self._size += 1
+        self._unfinished += 1
+        self._finished.clear()
+        self._available.release()
+
+    async def put(self, item: Tuple[EventType, dict]):
+        self.put_nowait(item)
+
+    async def get(self) -> Tuple[EventType, dict]:
+        await self._available.acquire()
+        lane = self._select_lane(time.monotonic())
+        enqueued_at, event_type, payload = lane.items.popleft()
+        now = time.monotonic()
+        lane.dequeued += 1
+        lane.last_served = now
+        lane.max_wait = max(lane.max_wait, now - enqueued_at)
+        self._size -= 1
+        return event_type, payload
+
+    def _select_lane(self, now: float) -> Lane:
+        # Starvation: eine Lane, die länger als max_wait nicht bedient wurde, kommt sofort dran
+        overdue = None
+        for lane in self.lanes.values():
+            if lane.items and now - lane.items[0][0] > self.max_wait and now - lane.last_served > self.max_wait:
+                if overdue is None or lane.last_served < overdue.last_served:
+                    overdue = lane
+        if overdue is not None:
+            return overdue
+
+        candidates = [lane for lane in self.weighted if lane.items]
+        if self.critical.items and (self._critical_burst < self.max_critical_burst or not candidates):
+            self._critical_burst += 1
+            return self.critical
+        self._critical_burst = 0
+
+        # smooth weighted round robin über alle nicht leeren Lanes
+        total = 0
+        selected = None
+        for lane in candidates:
+            lane.current += lane.weight
+            total += lane.weight
+            if selected is None or lane.current > selected.current:
+                selected = lane
+        selected.current -= total
+        return selected
+
+    def task_done(self):
+        if self._unfinished <= 0:
+            raise ValueError("task_done() called too many times")
+        self._unfinished -= 1
+        if self._unfinished == 0:
+            self._finished.set()
+
+    async def join(self):
+        await self._finished.wait()
+
+    def qsize(self) -> int:
+        return self._size
+
+    def empty(self) -> bool:
+        return self._size == 0
+
+    def get_stats(self) -> List[dict]:
+        return [lane.to_json() for lane in self.lanes.values()]
@@ -11,3 +11,6 @@ class EventType(Enum):
     VALUE_CHANGED = 6
     ALARM = 7
     ALARM_ACKNOWLEDGE = 8
+    COMMAND_ACK = 9
+    POLL = 10
+    VALUE_BATCH = 11
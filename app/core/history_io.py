@@ -0,0 +1,308 @@
+import csv
+import io
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import DateTime, Integer, insert, select
+
+from .database_manager import DatabaseManager
+from .serialization import format_timestamp
+
+from models.log import Log
+from models.value import Value
+
+
+logger = logging.getLogger(__name__)
+
+
+FORMATS = ("csv", "jsonl", "parquet")
+
+
+class HistoryTable:
+    """Import/export description of a history table"""
+
+    def __init__(self, model, columns: Sequence[str], import_columns: Sequence[str], device_column: str,
+                 required: Sequence[str], natural_key: Optional[Sequence[str]] = None):
+        self.model = model
+        self.name = model.__tablename__
+        self.columns = list(columns)  # Export
+        self.import_columns = list(import_columns)  # ohne Serial-Id
+        self.device_column = model.__table__.c[device_column]
+        self.required = set(required)
+        # Tabellen ohne fachlichen Primärschlüssel (Serial-Id): Duplikate über diese Spalten erkennen
+        self.natural_key = list(natural_key) if natural_key else None
+
+
+TABLES: Dict[str, HistoryTable] = {
+    "values": HistoryTable(Value, ["id", "timestamp", "value_type", "value", "unit"],
+                           ["id", "timestamp", "value_type", "value", "unit"], "id",
+                           ["id", "timestamp", "value_type", "value"]),
+    "logs": HistoryTable(Log, ["id", "timestamp", "message", "protocol", "level", "ref_id"],
+                         ["timestamp", "message", "protocol", "level", "ref_id"], "ref_id",
+                         ["timestamp", "message"], natural_key=["timestamp", "protocol", "ref_id", "message"]),
+}
+
+
+def format_for(path: str, format: Optional[str] = None) -> str:
+    """Explicit format or the one matching the file extension"""
+    if format:
+        fmt = format
+    elif path.endswith((".jsonl", ".ndjson", ".json")):
+        fmt = "jsonl"
+    elif path.endswith(".parquet"):
+        fmt = "parquet"
+    else:
+        fmt = "csv"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt}")
+    return fmt
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet needs pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def parse_time(value) -> Optional[datetime]:
+    """ISO string or datetime -> naive UTC (the timestamp columns are without time zone)"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# Reading
+def read_file(path: str, format: str, chunk_size: int) -> Iterator[List[Dict]]:
+    """Read a CSV/JSONL/Parquet file in chunks of dicts"""
+    if format == "parquet":
+        pyarrow = _require_pyarrow()
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pylist()
+        return
+
+    with open(path, newline="", encoding="utf-8") as file:
+        records = csv.DictReader(file) if format == "csv" else (json.loads(line) for line in file if line.strip())
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def _prepare(table: HistoryTable, records: List[Dict]) -> List[Dict]:
+    rows = []
+    for record in records:
+        row = {column: record.get(column) for column in table.import_columns}
+        row = {column: (None if value == "" else value) for column, value in row.items()}
+        row["timestamp"] = parse_time(row["timestamp"])
+        if "value" in row and row["value"] is not None:
+            row["value"] = str(row["value"])
+        missing = [column for column in table.required if row.get(column) is None]
+        if missing:
+            raise ValueError(f"Record without {', '.join(missing)}: {record}")
+        rows.append(row)
+    return rows
+
+
+# Import
+def _copy_chunk(raw_connection, table: HistoryTable, rows: List[Dict]) -> int:
+    """PostgreSQL: COPY into a temporary table, then insert while skipping existing rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row[column].isoformat() if isinstance(row[column], datetime) else row[column]
+                         for column in table.import_columns])
+    buffer.seek(0)
+
+    columns = ", ".join(f'"{column}"' for column in table.import_columns)
+    staging = f"import_{table.name}"
+    cursor = raw_connection.cursor()
+    try:
+        # nur die Importspalten, ohne Defaults: sonst zieht jede Zeile im Staging eine Id aus der Sequenz
+        cursor.execute(f'CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DELETE ROWS AS '
+                       f'SELECT {columns} FROM "{table.name}" WITH NO DATA')
+        cursor.copy_expert(f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        if table.natural_key:
+            # kein Unique-Key, ON CONFLICT greift nicht: vorhandene Einträge per NOT EXISTS überspringen
+            matches = " AND ".join(f'existing."{column}" IS NOT DISTINCT FROM staged."{column}"'
+                                   for column in table.natural_key)
+            cursor.execute(f'INSERT INTO "{table.name}" ({columns}) SELECT DISTINCT {columns} FROM {staging} staged '
+                           f'WHERE NOT EXISTS (SELECT 1 FROM "{table.name}" existing WHERE {matches})')
+        else:
+            cursor.execute(f'INSERT INTO "{table.name}" ({columns}) SELECT {columns} FROM {staging} '
+                           f'ON CONFLICT DO NOTHING')
+        inserted = cursor.rowcount
+        raw_connection.commit()
+    except Exception:
+        raw_connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return inserted
+
+
+def _new_rows(connection, table: HistoryTable, rows: List[Dict]) -> List[Dict]:
+    """Rows whose natural key is neither in the table (same time range) nor earlier in the chunk"""
+    key_columns = [table.model.__table__.c[column] for column in table.natural_key]
+    timestamp = table.model.__table__.c.timestamp
+    timestamps = [row["timestamp"] for row in rows]
+    seen = set(connection.execute(
+        select(*key_columns).where(timestamp >= min(timestamps), timestamp <= max(timestamps))).all())
+    new_rows = []
+    for row in rows:
+        key = tuple(row[column] for column in table.natural_key)
+        if key not in seen:
+            seen.add(key)
+            new_rows.append(row)
+    return new_rows
+
+
+def _insert_chunk(connection, table: HistoryTable, rows: List[Dict]) -> int:
+    """Other databases: one executemany per chunk, existing rows are skipped where the dialect allows it"""
+    statement = insert(table.model.__table__)
+    if connection.dialect.name == "sqlite":
+        statement = statement.prefix_with("OR IGNORE")
+    with connection.begin():
+        if table.natural_key and rows:
+            rows = _new_rows(connection, table, rows)
+        if not rows:
+            return 0
+        result = connection.execute(statement, rows)
+    return result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(rows)
+
+
+def import_chunks(database_manager: DatabaseManager, table_name: str, chunks: Iterable[List[Dict]]) -> Dict:
+    """Import chunks of records; only one chunk is held in memory at a time"""
+    table = TABLES[table_name]
+    database_manager.connect()
+    engine = database_manager.engine
+    stats = {"read": 0, "inserted": 0}
+
+    if engine.dialect.name == "postgresql":
+        raw_connection = engine.raw_connection()
+        try:
+            for chunk in chunks:
+                rows = _prepare(table, chunk)
+                stats["read"] += len(rows)
+                stats["inserted"] += _copy_chunk(raw_connection, table, rows)
+                logger.info(f"Imported {stats['read']} {table.name} rows")
+        finally:
+            raw_connection.close()
+    else:
+        with engine.connect() as connection:
+            for chunk in chunks:
+                rows = _prepare(table, chunk)
+                stats["read"] += len(rows)
+                stats["inserted"] += _insert_chunk(connection, table, rows)
+                logger.info(f"Imported {stats['read']} {table.name} rows")
+
+    stats["skipped"] = stats["read"] - stats["inserted"]
+    return stats
+
+
+# Export
+def export_chunks(database_manager: DatabaseManager, table_name: str, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None, device_id: Optional[str] = None,
+                  chunk_size: int = 10000) -> Iterator[List[tuple]]:
+    """
+    Stream rows ordered by timestamp with a server-side cursor (stream_results/yield_per)
+    from a read replica if configured, yielding lists of at most chunk_size tuples in TABLES[table_name].columns order.
+    """
+    table = TABLES[table_name]
+    columns = [table.model.__table__.c[column] for column in table.columns]
+    timestamp = table.model.__table__.c.timestamp
+
+    query = select(*columns)
+    if start is not None:
+        query = query.where(timestamp >= parse_time(start))
+    if end is not None:
+        query = query.where(timestamp < parse_time(end))
+    if device_id is not None:
+        query = query.where(table.device_column == device_id)
+    query = query.order_by(timestamp)
+
+    with database_manager.read_engine().connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+        for partition in result.partitions(chunk_size):
+            yield [tuple(row) for row in partition]
+
+
+def _text(value):
+    return format_timestamp(value) if isinstance(value, datetime) else value
+
+
+def encode_csv(columns: Sequence[str], chunks: Iterable[List[tuple]]) -> Iterator[str]:
+    """CSV text: the header, then one string per chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_text(value) for value in row] for row in chunk)
+        yield buffer.getvalue()
+
+
+def encode_ndjson(columns: Sequence[str], chunks: Iterable[List[tuple]]) -> Iterator[str]:
+    """Newline delimited JSON, one string per chunk"""
+    for chunk in chunks:
+        yield "".join(json.dumps(dict(zip(columns, map(_text, row))), ensure_ascii=False) + "\n" for row in chunk)
+
+
+def _arrow_schema(pyarrow, table: HistoryTable):
+    fields = []
+    for name in table.columns:
+        column_type = table.model.__table__.c[name].type
+        if isinstance(column_type, DateTime):
+            fields.append((name, pyarrow.timestamp("us")))
+        elif isinstance(column_type, Integer):
+            fields.append((name, pyarrow.int64()))
+        else:
+            fields.append((name, pyarrow.string()))
+    return pyarrow.schema(fields)
+
+
+def write_file(path: str, format: str, table_name: str, chunks: Iterable[List[tuple]]) -> int:
+    """Write exported chunks to a file ("-" = stdout for CSV/JSONL); returns the number of rows"""
+    table = TABLES[table_name]
+    columns = table.columns
+    count = 0
+
+    def counted():
+        nonlocal count
+        for chunk in chunks:
+            count += len(chunk)
+            yield chunk
+
+    if format == "parquet":
+        pyarrow = _require_pyarrow()
+        schema = _arrow_schema(pyarrow, table)
+        with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+            for chunk in counted():
+                writer.write_table(pyarrow.Table.from_pylist([dict(zip(columns, row)) for row in chunk], schema=schema))
+        return count
+
+    encode = encode_csv if format == "csv" else encode_ndjson
+    if path == "-":
+        for text in encode(columns, counted()):
+            sys.stdout.write(text)
+        return count
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        for text in encode(columns, counted()):
+            file.write(text)
+    return count
@@ -0,0 +1,191 @@
+import calendar
+import csv
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import select
+
+from .database_manager import DatabaseManager
+from .history_io import parse_time
+from .serialization import format_timestamp
+
+from models.value import Value
+
+
+logger = logging.getLogger(__name__)
+
+
+EPOCH = datetime(1970, 1, 1)
+
+# sync liest diesen Zeitraum vor dem Wasserzeichen erneut: Transaktionen, die erst nach
+# einem sync committen, und Uhrabweichung zwischen App und Datenbank (COPY-Import)
+SYNC_OVERLAP = timedelta(minutes=5)
+
+
+def _bucket_start(timestamp: datetime, bucket: int) -> datetime:
+    seconds = calendar.timegm(timestamp.timetuple())  # naive UTC
+    return EPOCH + timedelta(seconds=seconds - seconds % bucket)
+
+
+def aggregate_rows(chunks: Iterable[List[tuple]], bucket: int) -> List[Dict]:
+    """
+    Time-bucket aggregates (count/min/max/avg of numeric values) over rows in
+    export_chunks("values") order; the rows are sorted, so one bucket is open at a time.
+    """
+    result = []
+    current = None
+    for chunk in chunks:
+        for _, timestamp, _, value, _ in chunk:
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                continue
+            start = _bucket_start(timestamp, bucket)
+            if current is None or current["bucket"] != start:
+                current = {"bucket": start, "count": 0, "min": number, "max": number, "sum": 0.0}
+                result.append(current)
+            current["count"] += 1
+            current["min"] = min(current["min"], number)
+            current["max"] = max(current["max"], number)
+            current["sum"] += number
+    for entry in result:
+        entry["bucket"] = format_timestamp(entry["bucket"])
+        entry["avg"] = entry.pop("sum") / entry["count"]
+    return result
+
+
+class HistoryStore:
+    """
+    Columnar copy of the values table in an embedded DuckDB file for history analytics.
+
+    sync() copies rows by insertion time (values.inserted_at), so late or bulk-imported
+    values with old device timestamps are picked up too. The watermark is the newest
+    inserted_at in DuckDB minus SYNC_OVERLAP for transactions that committed late;
+    re-copied rows are skipped by the primary key. Chunks are fetched from the primary
+    without holding the DuckDB lock, aggregates only wait for the appends.
+    rebuild() copies everything again. Needs the optional duckdb package.
+    """
+
+    def __init__(self, path: str, database_manager: DatabaseManager, chunk_size: int = 50000):
+        self.path = path
+        self.database_manager = database_manager
+        self.chunk_size = chunk_size
+        self.connection = None
+        self.lock = threading.Lock()  # eine DuckDB-Verbindung, Zugriffe aus dem Threadpool
+        self.sync_lock = threading.Lock()  # sync und rebuild nacheinander, blockiert keine Auswertungen
+        self.synced_rows = 0
+
+    def open(self):
+        """Open the DuckDB file (done at startup, not on construction)"""
+        try:
+            import duckdb
+        except ImportError:
+            raise RuntimeError("The history store needs duckdb (pip install duckdb)")
+        with self.lock:
+            if self.connection is not None:
+                return
+            self.connection = duckdb.connect(self.path)
+            outdated = self.connection.execute(
+                "SELECT count(*) FROM information_schema.tables WHERE table_name = 'values' AND NOT EXISTS "
+                "(SELECT 1 FROM information_schema.columns WHERE table_name = 'values' AND column_name = 'inserted_at')"
+            ).fetchone()[0]
+            if outdated:
+                # abgeleitete Kopie: neu anlegen, der nächste sync kopiert alles
+                logger.info(f"History store {self.path} has the old schema, rebuilding")
+                self.connection.execute('DROP TABLE "values"')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS "values" (id VARCHAR, timestamp TIMESTAMP, value_type VARCHAR, '
+                'value VARCHAR, unit VARCHAR, number DOUBLE, inserted_at TIMESTAMP, PRIMARY KEY (id, timestamp))'
+            )
+
+    def _changed_chunks(self, since: Optional[datetime]) -> Iterator[List[tuple]]:
+        # Primary statt Replika: Replikationsverzug würde das Wasserzeichen überholen
+        table = Value.__table__
+        query = select(table.c.id, table.c.timestamp, table.c.value_type, table.c.value, table.c.unit,
+                       table.c.inserted_at)
+        if since is not None:
+            query = query.where(table.c.inserted_at >= since)
+        self.database_manager.connect()
+        with self.database_manager.engine.connect() as connection:
+            result = connection.execution_options(stream_results=True, yield_per=self.chunk_size).execute(query)
+            for partition in result.partitions(self.chunk_size):
+                yield [tuple(row) for row in partition]
+
+    def _append(self, chunk: List[tuple]) -> int:
+        # Massen-Insert über eine CSV-Datei, executemany ist in DuckDB langsam
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="", encoding="utf-8", delete=False) as file:
+            writer = csv.writer(file)
+            for row in chunk:
+                writer.writerow([row[0], format_timestamp(row[1]), row[2], row[3], row[4], format_timestamp(row[5])])
+        try:
+            return self.connection.execute(
+                'INSERT OR IGNORE INTO "values" SELECT id, timestamp, value_type, value, unit, '
+                "TRY_CAST(value AS DOUBLE), inserted_at FROM read_csv(?, header=false, columns={'id': 'VARCHAR', "
+                "'timestamp': 'TIMESTAMP', 'value_type': 'VARCHAR', 'value': 'VARCHAR', 'unit': 'VARCHAR', "
+                "'inserted_at': 'TIMESTAMP'})",
+                [file.name]
+            ).fetchone()[0]
+        finally:
+            os.unlink(file.name)
+
+    def _copy(self, since: Optional[datetime]) -> int:
+        count = 0
+        for chunk in self._changed_chunks(since):
+            with self.lock:
+                count += self._append(chunk)
+        self.synced_rows += count
+        return count
+
+    def sync(self) -> int:
+        """Copy rows inserted since the watermark; returns the number of new rows"""
+        with self.sync_lock:
+            with self.lock:
+                watermark = self.connection.execute('SELECT max(inserted_at) FROM "values"').fetchone()[0]
+            count = self._copy(watermark - SYNC_OVERLAP if watermark is not None else None)
+        if count:
+            logger.info(f"History store synced {count} values")
+        return count
+
+    def rebuild(self) -> int:
+        """Copy all values again (aggregates see a partial copy until it is done)"""
+        with self.sync_lock:
+            with self.lock:
+                self.connection.execute('DELETE FROM "values"')
+            count = self._copy(None)
+        logger.info(f"History store rebuilt with {count} values")
+        return count
+
+    def aggregate(self, device_id: str, bucket: int, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None) -> List[Dict]:
+        """Same result as aggregate_rows, computed by DuckDB"""
+        # Ursprung wie _bucket_start: DuckDB rechnet sonst ab 2000-01-03 (Wochen, ungerade Längen)
+        query = ("SELECT time_bucket(to_seconds(?), timestamp, TIMESTAMP '1970-01-01 00:00:00') AS bucket, "
+                 'count(number), min(number), max(number), avg(number) FROM "values" '
+                 'WHERE id = ? AND number IS NOT NULL')
+        params = [bucket, device_id]
+        if start is not None:
+            query += " AND timestamp >= ?"
+            params.append(parse_time(start))
+        if end is not None:
+            query += " AND timestamp < ?"
+            params.append(parse_time(end))
+        query += " GROUP BY bucket ORDER BY bucket"
+        with self.lock:
+            rows = self.connection.execute(query, params).fetchall()
+        return [{"bucket": format_timestamp(bucket_start), "count": count, "min": minimum, "max": maximum, "avg": avg}
+                for bucket_start, count, minimum, maximum, avg in rows]
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            rows, watermark = self.connection.execute('SELECT count(*), max(inserted_at) FROM "values"').fetchone()
+        return {"path": self.path, "rows": rows, "watermark": format_timestamp(watermark), "synced": self.synced_rows}
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
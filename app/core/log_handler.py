@@ -1,5 +1,7 @@
 import logging
+from typing import Optional
 
+from .change_tracker import ChangeTracker
 from .crud import create_log
 from .event_handler import EventHandler
 from .event_type import EventType
@@ -14,9 +16,11 @@ logger = logging.getLogger(__name__)
 
 class LogHandler(EventHandler):
 
-    def __init__(self, database_manager: DatabaseManager, websocket_manager: WebSocketManager):
+    def __init__(self, database_manager: DatabaseManager, websocket_manager: WebSocketManager,
+                 change_tracker: Optional[ChangeTracker] = None):
         self.database_manager = database_manager
         self.websocket_manager = websocket_manager
+        self.change_tracker = change_tracker or ChangeTracker()
 
     async def handle(self, event_type: EventType, payload: dict):
 
@@ -28,3 +32,4 @@ class LogHandler(EventHandler):
         with self.database_manager.session_scope() as db:
             create_log(db, new_log)
             await self.websocket_manager.broadcast_protocol_entry(new_log.to_json())
+        self.change_tracker.touch("logs")  # erst nach dem Commit, sonst cacht die REST-API den alten Stand
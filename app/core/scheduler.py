@@ -0,0 +1,312 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+MISFIRE_COALESCE = "coalesce"  # verpasste Ticks werden zu einem Lauf zusammengefasst
+MISFIRE_SKIP = "skip"  # verpasste Ticks werden verworfen, weiter mit dem nächsten regulären Termin
+
+
+class Job:
+    """A scheduled callback with its next deadline (monotonic clock) and lateness metrics"""
+
+    def __init__(self, name: str, callback: Callable[[], Awaitable[None]], jitter: float = 0.0,
+                 misfire: str = MISFIRE_COALESCE, misfire_grace: float = 1.0):
+        if misfire not in (MISFIRE_COALESCE, MISFIRE_SKIP):
+            raise ValueError(f"Unknown misfire policy {misfire}")
+        self.name = name
+        self.callback = callback
+        self.jitter = jitter
+        self.misfire = misfire
+        self.misfire_grace = misfire_grace
+        self.next_run = 0.0
+        self.removed = False
+        self.task: Optional[asyncio.Task] = None  # laufende Ausführung
+        # Metriken
+        self.runs = 0
+        self.missed = 0
+        self.overlapped = 0  # übersprungen, weil der vorige Lauf noch nicht fertig war
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+        self.total_lateness = 0.0
+
+    def _jitter(self) -> float:
+        return random.uniform(0, self.jitter) if self.jitter else 0.0
+
+    def first_run(self, now: float):
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    def advance(self, now: float) -> int:
+        """Move next_run past `now`; returns the number of regular ticks that were missed"""
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    def to_json(self):
+        return {
+            "name": self.name,
+            "runs": self.runs,
+            "missed": self.missed,
+            "overlapped": self.overlapped,
+            "running": self.task is not None and not self.task.done(),
+            "next_run_in": round(max(0.0, self.next_run - time.monotonic()), 3),
+            "lateness_ms": {
+                "last": round(self.last_lateness * 1000, 3),
+                "max": round(self.max_lateness * 1000, 3),
+                "avg": round(self.total_lateness / self.runs * 1000, 3) if self.runs else None
+            }
+        }
+
+
+class IntervalJob(Job):
+    """
+    Runs every `interval` seconds, starting `offset` seconds after it was added.
+    Deadlines are computed from the planned start, so processing time never adds up to drift.
+    """
+
+    def __init__(self, name: str, interval: float, callback: Callable[[], Awaitable[None]], offset: float = 0.0, **kwargs):
+        super().__init__(name, callback, **kwargs)
+        if interval <= 0:
+            raise ValueError("Interval must be positive")
+        self.interval = interval
+        self.offset = offset
+        self._base = 0.0  # regulärer Termin ohne Jitter
+
+    def first_run(self, now: float):
+        self._base = now + self.offset
+        self.next_run = self._base + self._jitter()
+
+    def advance(self, now: float) -> int:
+        self._base += self.interval
+        missed = 0
+        if self._base <= now:
+            missed = int((now - self._base) // self.interval) + 1
+            self._base += missed * self.interval
+        self.next_run = self._base + self._jitter()
+        return missed
+
+    def to_json(self):
+        return {**super().to_json(), "interval": self.interval, "offset": self.offset}
+
+
+class CronExpression:
+    """
+    Minimal cron expression "minute hour day month weekday".
+    Supports *, lists (1,2), ranges (1-5) and steps (*/15, 0-30/5); weekday 0 and 7 are Sunday.
+    """
+
+    FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Invalid cron expression '{expression}'")
+        self.expression = expression
+        fields = []
+        for part, (low, high) in zip(parts, self.FIELDS):
+            fields.append(self._parse_field(part, low, high))
+        self.minutes, self.hours, self.days, self.months, weekdays = fields
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        # Wie bei cron: sind Tag und Wochentag eingeschränkt, reicht einer von beiden
+        self.day_restricted = parts[2] != "*"
+        self.weekday_restricted = parts[4] != "*"
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> Set[int]:
+        values = set()
+        for item in field.split(","):
+            step = 1
+            if "/" in item:
+                item, step_text = item.split("/", 1)
+                step = int(step_text)
+            if item == "*":
+                start, end = low, high
+            elif "-" in item:
+                start, end = (int(x) for x in item.split("-", 1))
+            else:
+                start = end = int(item)
+                if step != 1:
+                    end = high
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(f"Invalid cron field '{field}'")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        """First matching minute strictly after `moment`"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = (candidate.year + 1, 1) if candidate.month == 12 else (candidate.year, candidate.month + 1)
+                candidate = candidate.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
+
+
+class CronJob(Job):
+    """Runs at wall-clock times (local time) matching a cron expression"""
+
+    def __init__(self, name: str, expression: str, callback: Callable[[], Awaitable[None]], **kwargs):
+        super().__init__(name, callback, **kwargs)
+        self.cron = CronExpression(expression)
+        self._due: Optional[datetime] = None
+
+    def _schedule(self, now: float, due: datetime):
+        self._due = due
+        self.next_run = now + (due - datetime.now()).total_seconds() + self._jitter()
+
+    def first_run(self, now: float):
+        self._schedule(now, self.cron.next_after(datetime.now()))
+
+    def advance(self, now: float) -> int:
+        wall_now = datetime.now()
+        missed = 0
+        due = self.cron.next_after(self._due)
+        while due <= wall_now:
+            missed += 1
+            due = self.cron.next_after(due)
+        self._schedule(now, due)
+        return missed
+
+    def to_json(self):
+        return {**super().to_json(), "cron": self.cron.expression}
+
+
+class Scheduler:
+    """
+    Deadline based scheduler.
+
+    Jobs are kept in a heap ordered by their next deadline on the monotonic clock;
+    the scheduler sleeps exactly until the earliest deadline. When the loop was
+    blocked and ticks were missed, the job's misfire policy decides whether they
+    are coalesced into one run or skipped. Lateness (actual start - deadline) is
+    recorded per job. Every run is a task of its own, so a slow job never delays
+    the others; a job whose previous run is still going is skipped for that tick.
+    """
+
+    def __init__(self, stop_event: asyncio.Event):
+        self.stop_event = stop_event
+        self.jobs: Dict[str, Job] = {}
+        self._heap: List = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._running: Set[asyncio.Task] = set()
+
+    def add_job(self, job: Job) -> Job:
+        if job.name in self.jobs:
+            self.remove(job.name)
+        job.first_run(time.monotonic())
+        self.jobs[job.name] = job
+        heapq.heappush(self._heap, (job.next_run, next(self._sequence), job))
+        self._wakeup.set()
+        return job
+
+    def add_interval(self, name: str, interval: float, callback: Callable[[], Awaitable[None]],
+                     offset: float = 0.0, jitter: float = 0.0, misfire: str = MISFIRE_COALESCE) -> Job:
+        return self.add_job(IntervalJob(name, interval, callback, offset=offset, jitter=jitter, misfire=misfire,
+                                        misfire_grace=min(1.0, interval / 2)))
+
+    def add_cron(self, name: str, expression: str, callback: Callable[[], Awaitable[None]],
+                 jitter: float = 0.0, misfire: str = MISFIRE_COALESCE) -> Job:
+        return self.add_job(CronJob(name, expression, callback, jitter=jitter, misfire=misfire))
+
+    def remove(self, name: str):
+        job = self.jobs.pop(name, None)
+        if job is not None:
+            job.removed = True  # Heap-Eintrag wird beim nächsten Pop verworfen
+
+    async def _wait(self, timeout: Optional[float]):
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _watch_stop(self):
+        await self.stop_event.wait()
+        self._wakeup.set()
+
+    async def run(self):
+        stop_watcher = asyncio.create_task(self._watch_stop())
+        try:
+            while not self.stop_event.is_set():
+                while self._heap and self._heap[0][2].removed:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    await self._wait(None)
+                    continue
+
+                deadline, _, job = self._heap[0]
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    await self._wait(delay)
+                    continue
+
+                heapq.heappop(self._heap)
+                self._execute(job, time.monotonic())
+                if not job.removed:
+                    heapq.heappush(self._heap, (job.next_run, next(self._sequence), job))
+        finally:
+            stop_watcher.cancel()
+            # laufende Jobs zu Ende laufen lassen, danach werden ihre Ressourcen geschlossen
+            if self._running:
+                await asyncio.gather(*self._running, return_exceptions=True)
+
+    def _execute(self, job: Job, now: float):
+        lateness = now - job.next_run
+        missed = job.advance(now)
+        job.missed += missed
+
+        if lateness > job.misfire_grace and job.misfire == MISFIRE_SKIP:
+            job.missed += 1
+            logger.warning(f"Job {job.name} skipped, {lateness:.3f}s late")
+            return
+
+        if job.task is not None and not job.task.done():
+            job.overlapped += 1
+            logger.warning(f"Job {job.name} skipped, previous run still running")
+            return
+
+        job.runs += 1
+        job.last_lateness = lateness
+        job.max_lateness = max(job.max_lateness, lateness)
+        job.total_lateness += lateness
+        if lateness > job.misfire_grace:
+            logger.warning(f"Job {job.name} is {lateness:.3f}s late ({missed} ticks coalesced)")
+
+        job.task = asyncio.create_task(self._run_job(job), name=f"job:{job.name}")
+        self._running.add(job.task)
+        job.task.add_done_callback(self._running.discard)
+
+    @staticmethod
+    async def _run_job(job: Job):
+        try:
+            await job.callback()
+        except Exception as e:
+            logger.exception(f"Job {job.name} raised Exception {e}")
+
+    def get_stats(self) -> List[dict]:
+        return [job.to_json() for job in self.jobs.values()]
@@ -0,0 +1,46 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import DateTime
+
+
+@lru_cache(maxsize=8192)
+def format_timestamp(timestamp: Optional[datetime]) -> Optional[str]:
+    """isoformat() with a cache; current values and alarms are sent with the same timestamps again and again"""
+    return timestamp.isoformat() if timestamp is not None else None
+
+
+def parse_timestamp(data: dict) -> dict:
+    """Copy of `data` with an ISO timestamp string converted to datetime (the input is not modified)"""
+    timestamp = data.get("timestamp")
+    if isinstance(timestamp, str):
+        return {**data, "timestamp": datetime.fromisoformat(timestamp)}
+    return data
+
+
+class RowSerializer:
+    """
+    Turns plain result tuples of a column select into JSON-ready dicts.
+
+    Keys and timestamp positions are resolved once from the selected columns, so
+    read-only snapshots skip ORM hydration and per-row attribute lookups.
+    """
+
+    def __init__(self, *columns):
+        self.columns = columns
+        self.keys = tuple(column.key for column in columns)
+        self.timestamps = tuple(index for index, column in enumerate(columns) if isinstance(column.type, DateTime))
+
+    def __call__(self, rows: Iterable[tuple]) -> List[Dict]:
+        keys = self.keys
+        if not self.timestamps:
+            return [dict(zip(keys, row)) for row in rows]
+
+        result = []
+        for row in rows:
+            row = list(row)
+            for index in self.timestamps:
+                row[index] = format_timestamp(row[index])
+            result.append(dict(zip(keys, row)))
+        return result
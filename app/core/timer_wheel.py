@@ -0,0 +1,58 @@
+import math
+from typing import Dict, Hashable, List, Tuple
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel.
+
+    Time is divided into ticks of `tick` seconds; a timer due at tick n lives in
+    bucket n % slots together with its absolute tick number, so timers further
+    away than one revolution simply stay in their bucket until their round comes.
+    Scheduling and cancelling are O(1), advancing costs one bucket per elapsed tick.
+    """
+
+    def __init__(self, now: float, tick: float = 1.0, slots: int = 512):
+        if tick <= 0 or slots < 1:
+            raise ValueError("tick and slots must be positive")
+        self.tick = tick
+        self.slots = slots
+        self.buckets: List[Dict[Hashable, int]] = [{} for _ in range(slots)]
+        self.timers: Dict[Hashable, int] = {}  # key -> fälliger Tick
+        self.current_tick = int(now / tick)
+
+    def __len__(self) -> int:
+        return len(self.timers)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.timers
+
+    def schedule(self, key: Hashable, deadline: float):
+        """(Re)schedule `key` to expire at `deadline` (same clock as `now`)"""
+        self.cancel(key)
+        due_tick = max(math.ceil(deadline / self.tick), self.current_tick + 1)
+        self.timers[key] = due_tick
+        self.buckets[due_tick % self.slots][key] = due_tick
+
+    def cancel(self, key: Hashable):
+        due_tick = self.timers.pop(key, None)
+        if due_tick is not None:
+            self.buckets[due_tick % self.slots].pop(key, None)
+
+    def advance(self, now: float) -> List[Tuple[Hashable, int]]:
+        """Advance to `now` and return the expired (key, due tick) pairs"""
+        target = int(now / self.tick)
+        expired = []
+        # nach langer Pause reicht eine Umdrehung, danach ist jeder Bucket einmal geprüft
+        ticks = range(self.current_tick + 1, target + 1)
+        if len(ticks) > self.slots:
+            ticks = range(target - self.slots + 1, target + 1)
+        for tick in ticks:
+            bucket = self.buckets[tick % self.slots]
+            due = [(key, due_tick) for key, due_tick in bucket.items() if due_tick <= target]
+            for key, due_tick in due:
+                del bucket[key]
+                del self.timers[key]
+            expired.extend(due)
+        self.current_tick = max(self.current_tick, target)
+        return expired
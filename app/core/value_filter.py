@@ -0,0 +1,140 @@
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from .crud import read_value_filters
+from .database_manager import DatabaseManager
+
+from models.value import Value
+
+
+logger = logging.getLogger(__name__)
+
+
+CHANGED = "changed"  # speichern, VALUE_CHANGED auslösen
+HEARTBEAT = "heartbeat"  # unverändert, aber max_interval erreicht -> speichern ohne VALUE_CHANGED
+DROP = "drop"  # innerhalb Deadband / min_interval -> nur im Speicher
+
+# Defaults per value type, used when no rule matches
+DEFAULT_RULES = {
+    None: {"deadband": 0.0, "min_interval": 0.0, "max_interval": 900.0},
+    "temperature": {"deadband": 0.1, "min_interval": 0.0, "max_interval": 900.0},
+    "humidity": {"deadband": 1.0, "min_interval": 0.0, "max_interval": 900.0},
+    "power": {"deadband": 5.0, "min_interval": 0.0, "max_interval": 900.0},
+    "state": {"deadband": 0.0, "min_interval": 0.0, "max_interval": 3600.0},
+}
+
+
+def _naive_utc(timestamp: datetime) -> datetime:
+    if timestamp.tzinfo is not None:
+        return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ValueFilter:
+    """
+    Change detection before values are persisted.
+
+    For every (device, value type) the last stored sample is kept in memory. A new
+    sample is stored only if it moved at least `deadband` and min_interval has passed
+    since the last stored change; unchanged samples are stored as a heartbeat once
+    max_interval has passed. Everything else is dropped.
+    check() only classifies; accept() records a sample once it is committed, so a
+    failed or skipped insert does not make the filter drop the following samples.
+    Rules are looked up by (device_id, value_type), (device_id, *), (*, value_type)
+    and finally the defaults; the resolved rule is cached per key.
+    """
+
+    def __init__(self, database_manager: DatabaseManager):
+        self.database_manager = database_manager
+        self.rules: Dict[Tuple[Optional[str], Optional[str]], Dict] = {}
+        self._resolved: Dict[Tuple[str, str], Dict] = {}
+        self._state: Dict[Tuple[str, str], Tuple[str, Optional[float], datetime]] = {}
+        self.stats = {CHANGED: 0, HEARTBEAT: 0, DROP: 0}
+
+    def load(self):
+        """Load the rules from the database"""
+        with self.database_manager.session_scope() as db:
+            rules = [rule.to_json() for rule in read_value_filters(db)]
+
+        self.rules = {(None, value_type): rule for value_type, rule in DEFAULT_RULES.items()}
+        for rule in rules:
+            self.rules[(rule["device_id"], rule["value_type"])] = {
+                "deadband": rule["deadband"],
+                "min_interval": rule["min_interval"],
+                "max_interval": rule["max_interval"]
+            }
+        self._resolved.clear()
+        logger.info(f"Value filter loaded with {len(rules)} rules")
+
+    def seed(self, values: Iterable[Dict]):
+        """Start from the last stored value per device (device index), so a restart does not store everything again"""
+        for value in values:
+            timestamp = value.get("timestamp")
+            if isinstance(timestamp, str):
+                timestamp = datetime.fromisoformat(timestamp)
+            if timestamp is not None and (value["id"], value.get("value_type")) not in self._state:
+                self.accept(value["id"], value.get("value_type"), value.get("value"), timestamp)
+        logger.info(f"Value filter seeded with {len(self._state)} values")
+
+    def rule_for(self, device_id: str, value_type: str) -> Dict:
+        key = (device_id, value_type)
+        rule = self._resolved.get(key)
+        if rule is None:
+            rule = (self.rules.get(key) or self.rules.get((device_id, None))
+                    or self.rules.get((None, value_type)) or self.rules.get((None, None))
+                    or DEFAULT_RULES[None])
+            self._resolved[key] = rule
+        return rule
+
+    def check(self, value: Value, pending: Optional[Dict] = None) -> str:
+        """
+        Classify a sample as CHANGED, HEARTBEAT or DROP without changing the state.
+        `pending` collects the samples to be stored within one batch, so later samples
+        of the same batch are compared against them.
+        """
+        key = (value.id, value.value_type)
+        timestamp = _naive_utc(value.timestamp)
+        number = _number(value.value)
+        last = pending[key] if pending is not None and key in pending else self._state.get(key)
+
+        if last is None:
+            decision = CHANGED
+        else:
+            rule = self.rule_for(value.id, value.value_type)
+            last_value, last_number, last_timestamp = last
+            elapsed = (timestamp - last_timestamp).total_seconds()
+
+            if number is not None and last_number is not None and rule["deadband"]:
+                # mindestens `deadband` Änderung (Toleranz gegen Rundungsfehler bei z.B. 20.1 - 20.0)
+                changed = abs(number - last_number) >= rule["deadband"] - 1e-9
+            elif number is not None and last_number is not None:
+                changed = number != last_number
+            else:
+                changed = value.value != last_value
+
+            if changed and elapsed >= rule["min_interval"]:
+                decision = CHANGED
+            elif not changed and elapsed >= rule["max_interval"]:
+                decision = HEARTBEAT
+            else:
+                decision = DROP
+
+        self.stats[decision] += 1
+        if decision != DROP and pending is not None:
+            pending[key] = (value.value, number, timestamp)
+        return decision
+
+    def accept(self, device_id: str, value_type: Optional[str], value, timestamp: datetime):
+        """Remember a sample that was actually stored"""
+        self._state[(device_id, value_type)] = (value, _number(value), _naive_utc(timestamp))
+
+    def get_stats(self) -> Dict:
+        return {"rules": len(self.rules), "tracked": len(self._state), **self.stats}
@@ -1,15 +1,16 @@
 import logging
 import asyncio
+from datetime import datetime
 
-from pendulum import datetime, timezone
-
-from .crud import create_or_update_value, read_current_values, read_value_or_null
+from .crud import create_values
+from .value_filter import DROP, HEARTBEAT, ValueFilter
 from .event_handler import EventHandler
 from .event_type import EventType
 from .database_manager import DatabaseManager
 from .websocket_manager import WebSocketManager
 
 from models.value import Value
+from services.device_service import DeviceService
 
 
 logger = logging.getLogger(__name__)
@@ -17,38 +18,74 @@ logger = logging.getLogger(__name__)
 
 class ValueHandler(EventHandler):
 
-    def __init__(self, queue: asyncio.Queue, database_manager: DatabaseManager, websocket_manager: WebSocketManager):
+    def __init__(self, queue: asyncio.Queue, database_manager: DatabaseManager, websocket_manager: WebSocketManager,
+                 device_service: DeviceService, value_filter: ValueFilter):
         self.queue = queue
+        self.value_filter = value_filter
         self.database_manager = database_manager
         self.websocket_manager = websocket_manager
+        self.device_service = device_service
 
     async def handle(self, event_type: EventType, payload: dict):
 
-        if event_type != EventType.VALUE:
+        if event_type == EventType.VALUE:
+            logger.info(f"New value entry: {payload}")
+            new_values = [Value.from_dict(payload)]
+        elif event_type == EventType.VALUE_BATCH:
+            logger.info(f"New value batch with {len(payload.get('values', []))} entries")
+            new_values = [Value.from_dict(value) for value in payload.get("values", [])]
+        else:
             return
 
-        logger.info(f"New value entry: {payload}")
-        new_value = Value.from_dict(payload)
+        decisions = {}
+        pending = {}  # im selben Batch gegen die vorherigen Samples prüfen
+        for new_value in new_values:
+            if new_value.timestamp is None:
+                new_value.timestamp = datetime.utcnow()
+            decisions[id(new_value)] = self.value_filter.check(new_value, pending)
+        new_values = [new_value for new_value in new_values if decisions[id(new_value)] != DROP]
+        if not new_values:
+            return  # alles innerhalb der Deadband, nichts zu speichern
+
+        # serialize before the commit expires the instances (avoids a refresh query per row)
+        serialized = {id(new_value): new_value.to_json() for new_value in new_values}
+        samples = {id(new_value): (new_value.id, new_value.value_type, new_value.value, new_value.timestamp)
+                   for new_value in new_values}
 
+        # one transaction and one existence lookup per event, also for batches
         with self.database_manager.session_scope() as db:
-            old_value = read_value_or_null(db, new_value.id)
-            create_or_update_value(db, new_value)
+            inserted = create_values(db, new_values)
+        changed = False
+
+        for new_value in inserted:
+            # erst nach dem Commit als gespeichert merken
+            self.value_filter.accept(*samples[id(new_value)])
+            value_json = serialized[id(new_value)]
+            # previous value from the in-memory device index instead of re-reading the DB
+            old_value = self.device_service.get_latest_value(value_json["id"])
+            self.device_service.update_value(value_json)
+
+            if decisions[id(new_value)] == HEARTBEAT:
+                continue  # nur Lebenszeichen, keine Änderung
+            changed = True
 
             payload = {
-                "id": new_value.id,
-                "values": [new_value.to_json()]
+                "id": value_json["id"],
+                "values": [dict(value_json)]
             }
             if old_value is not None:
-                payload["values"].append(old_value.to_json())
+                payload["values"].append(dict(old_value))
 
             # TODO validate and remove id from values
             for value in payload["values"]:
                 assert value["id"] == payload["id"]
                 del value["id"]
-                
+
             await self.queue.put((EventType.VALUE_CHANGED, payload))
 
-        with self.database_manager.session_scope() as db:
-            latest_values = read_current_values(db)
-            update_data = [value_entry.to_json() for value_entry in latest_values]
-            await self.websocket_manager.broadcast_dashboard_values(update_data)
+        if not changed:
+            return
+
+        # current values come from the in-memory device index, no DB round trip
+        update_data = self.device_service.get_current_values()
+        await self.websocket_manager.broadcast_dashboard_values(update_data)
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Set
+
+from .event_handler import EventHandler
+from .event_type import EventType
+from .timer_wheel import TimerWheel
+from .websocket_manager import WebSocketManager
+
+from services.device_service import DeviceService
+
+
+logger = logging.getLogger(__name__)
+
+
+class Watchdog(EventHandler):
+    """
+    Detects devices that stopped reporting.
+
+    Every device gets a timeout (its report_interval, else the poll interval of the
+    owning plugin, times `grace`). A value only stores the last-seen time; the timer
+    in the wheel is moved lazily when it expires and the device was seen meanwhile,
+    so an update is a dict write and no table is ever scanned. Devices going offline
+    or coming back raise/clear a DeviceOffline alarm.
+    Devices that only have the plugin's poll interval are watched once they have
+    reported a value, so devices that never deliver data do not alarm on every start.
+    """
+
+    alarm_type = "DeviceOffline"
+
+    def __init__(self, queue: asyncio.Queue, device_service: DeviceService, websocket_manager: WebSocketManager,
+                 grace: float = 3.0, tick: float = 1.0, priority: int = 1):
+        self.queue = queue
+        self.device_service = device_service
+        self.websocket_manager = websocket_manager
+        self.grace = grace
+        self.priority = priority
+        self.wheel = TimerWheel(time.monotonic(), tick=tick)
+        self.plugin_intervals: Dict[str, float] = {}
+        self.timeouts: Dict[str, Optional[float]] = {}
+        self.last_seen: Dict[str, float] = {}  # monotonic
+        self.offline: Set[str] = set()
+
+    def load(self, plugin_intervals: Dict[str, float], offline: Iterable[str] = ()):
+        """
+        Start watching the registered devices with a report_interval or a stored value.
+        `offline` are the devices with an active DeviceOffline alarm from the previous run;
+        they stay offline until they report again, which clears the alarm.
+        """
+        self.plugin_intervals = {name: interval for name, interval in plugin_intervals.items() if interval}
+        self.timeouts.clear()
+        for device_id in offline:
+            self.offline.add(device_id)
+            self.device_service.set_online(device_id, False)
+
+        now = time.monotonic()
+        for device in self.device_service.get_devices():
+            device_id = device["id"]
+            if device_id in self.offline:
+                continue  # Timer erst wieder mit dem nächsten Wert
+            if not device.get("report_interval") and self.device_service.get_latest_value(device_id) is None:
+                continue  # hat noch nie Werte geliefert (z.B. Plugin-Stubs)
+            timeout = self.timeout_for(device_id)
+            if timeout is not None:
+                self.last_seen.setdefault(device_id, now)
+                self.wheel.schedule(device_id, self.last_seen[device_id] + timeout)
+        logger.info(f"Watchdog watches {len(self.wheel)} devices, {len(self.offline)} offline")
+
+    def timeout_for(self, device_id: str) -> Optional[float]:
+        if device_id in self.timeouts:
+            return self.timeouts[device_id]
+        device = self.device_service.get_device(device_id) or {}
+        interval = device.get("report_interval") or self.plugin_intervals.get(device.get("plugin"))
+        timeout = interval * self.grace if interval else None
+        self.timeouts[device_id] = timeout
+        return timeout
+
+    async def handle(self, event_type: EventType, payload: dict):
+
+        if event_type == EventType.VALUE:
+            await self.seen(payload.get("id"), time.monotonic())
+        elif event_type == EventType.VALUE_BATCH:
+            now = time.monotonic()
+            for device_id in {value.get("id") for value in payload.get("values", [])}:
+                await self.seen(device_id, now)
+
+    async def seen(self, device_id: str, now: float):
+        self.last_seen[device_id] = now
+        if device_id not in self.wheel:
+            timeout = self.timeout_for(device_id)
+            if timeout is not None:
+                self.wheel.schedule(device_id, now + timeout)
+        if device_id in self.offline:
+            self.offline.discard(device_id)
+            self.device_service.set_online(device_id, True)
+            await self._alarm(device_id, False, f"Gerät {device_id} meldet wieder Werte")
+            await self._broadcast()
+
+    async def check(self):
+        """Expire due timers; runs as a scheduler job every tick"""
+        now = time.monotonic()
+        went_offline = 0
+        for device_id, _ in self.wheel.advance(now):
+            timeout = self.timeout_for(device_id)
+            if timeout is None or device_id in self.offline:
+                continue
+            deadline = self.last_seen.get(device_id, now) + timeout
+            if deadline > now:
+                self.wheel.schedule(device_id, deadline)  # zwischenzeitlich gemeldet -> Timer nachziehen
+                continue
+            self.offline.add(device_id)
+            self.device_service.set_online(device_id, False)
+            went_offline += 1
+            await self._alarm(device_id, True, f"Gerät {device_id} meldet seit {timeout:.0f} s keine Werte")
+        if went_offline:
+            logger.warning(f"Watchdog: {went_offline} devices went offline")
+            await self._broadcast()
+
+    async def _alarm(self, device_id: str, active: bool, message: str):
+        alarm_payload = {
+            "active": active,
+            "acknowledged": False,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "message": message,
+            "alarm_type": self.alarm_type,
+            "device_id": device_id,
+            "priority": self.priority
+        }
+        await self.queue.put((EventType.ALARM, alarm_payload))
+
+    async def _broadcast(self):
+        await self.websocket_manager.broadcast_dashboard_values(self.device_service.get_current_values())
+
+    def get_stats(self) -> dict:
+        return {"watched": len(self.wheel), "offline": len(self.offline), "seen": len(self.last_seen)}
@@ -1,99 +1,230 @@
-from typing import List, Dict
-from fastapi import WebSocket
+from typing import List, Dict, Optional
+from fastapi import WebSocket, WebSocketDisconnect
+import asyncio
 import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 
+CHANNELS = ("protocol", "dashboard", "alarm", "command")
+
+
+class Connection:
+    """A registered websocket with its metadata"""
+
+    __slots__ = ("websocket", "channel", "client", "connected_at", "last_seen", "messages_sent", "rtt")
+
+    def __init__(self, websocket: WebSocket, channel: str):
+        self.websocket = websocket
+        self.channel = channel
+        client = getattr(websocket, "client", None)
+        self.client = client.host if client else None
+        self.connected_at = time.monotonic()
+        self.last_seen = self.connected_at
+        self.messages_sent = 0
+        self.rtt: Optional[float] = None  # Laufzeit des letzten Ping/Pong
+
+    def to_json(self, now: float):
+        return {
+            "channel": self.channel,
+            "client": self.client,
+            "connected_s": round(now - self.connected_at, 1),
+            "idle_s": round(now - self.last_seen, 1),
+            "messages_sent": self.messages_sent,
+            "rtt_ms": round(self.rtt * 1000, 1) if self.rtt is not None else None
+        }
+
+
 class WebSocketManager:
-    def __init__(self):
+    """
+    Registry of the dashboard, protocol, alarm and command websockets.
+
+    Connections are kept in dicts keyed by the websocket, so connect and disconnect
+    are O(1). The server sends a ping every `heartbeat_interval` seconds; every
+    message from the client (pong or otherwise) counts as a sign of life. Connections
+    silent for longer than `idle_timeout` are closed and dropped, as are clients that
+    do not take a broadcast within `send_timeout`.
+    """
+
+    def __init__(self, max_connections: int = 1000, max_connections_per_client: int = 50,
+                 heartbeat_interval: float = 20.0, idle_timeout: float = 60.0, send_timeout: float = 5.0):
         # Separate connections for different types
-        self.protocol_connections: List[WebSocket] = []
-        self.dashboard_connections: List[WebSocket] = []
-        self.alarm_connections: List[WebSocket] = []
+        self.connections: Dict[str, Dict[WebSocket, Connection]] = {channel: {} for channel in CHANNELS}
+        self.clients: Dict[Optional[str], int] = {}  # offene Verbindungen je Client-Adresse
+        self.max_connections = max_connections
+        self.max_connections_per_client = max_connections_per_client
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.send_timeout = send_timeout
+        self.rejected = 0
+        self.reaped = 0
 
-    async def connect_protocol(self, websocket: WebSocket):
-        """Connect a websocket for protocol updates"""
+    def count(self) -> int:
+        return sum(len(connections) for connections in self.connections.values())
+
+    async def connect(self, channel: str, websocket: WebSocket) -> bool:
+        """Accept and register a websocket; over the limits it is closed with 1013 (try again later)"""
         await websocket.accept()
-        self.protocol_connections.append(websocket)
-        logger.info(f"Protocol WebSocket connected. Total connections: {len(self.protocol_connections)}")
+        connection = Connection(websocket, channel)
+        per_client = self.clients.get(connection.client, 0) if connection.client is not None else 0
+        if self.count() >= self.max_connections or per_client >= self.max_connections_per_client:
+            self.rejected += 1
+            logger.warning(f"{channel.capitalize()} WebSocket from {connection.client} rejected, connection limit reached")
+            await self._close(websocket, 1013, "Too many connections")
+            return False
 
-    async def connect_dashboard(self, websocket: WebSocket):
+        self.connections[channel][websocket] = connection
+        self.clients[connection.client] = self.clients.get(connection.client, 0) + 1
+        logger.info(f"{channel.capitalize()} WebSocket connected. Total connections: {len(self.connections[channel])}")
+        return True
+
+    def disconnect(self, channel: str, websocket: WebSocket):
+        """Unregister a websocket (safe to call more than once)"""
+        connection = self.connections[channel].pop(websocket, None)
+        if connection is None:
+            return
+        remaining = self.clients.get(connection.client, 1) - 1
+        if remaining:
+            self.clients[connection.client] = remaining
+        else:
+            self.clients.pop(connection.client, None)
+        logger.info(f"{channel.capitalize()} WebSocket disconnected. "
+                    f"Remaining connections: {len(self.connections[channel])}")
+
+    async def connect_protocol(self, websocket: WebSocket) -> bool:
+        """Connect a websocket for protocol updates"""
+        return await self.connect("protocol", websocket)
+
+    async def connect_dashboard(self, websocket: WebSocket) -> bool:
         """Connect a websocket for dashboard updates"""
-        await websocket.accept()
-        self.dashboard_connections.append(websocket)
-        logger.info(f"Dashboard WebSocket connected. Total connections: {len(self.dashboard_connections)}")
+        return await self.connect("dashboard", websocket)
 
-    async def connect_alarm(self, websocket: WebSocket):
+    async def connect_alarm(self, websocket: WebSocket) -> bool:
         """Connect a websocket for alarm updates"""
-        await websocket.accept()
-        self.alarm_connections.append(websocket)
-        logger.info(f"Alarm WebSocket connected. Total connections: {len(self.alarm_connections)}")
+        return await self.connect("alarm", websocket)
+
+    async def connect_command(self, websocket: WebSocket) -> bool:
+        """Connect a websocket for device commands"""
+        return await self.connect("command", websocket)
 
     def disconnect_protocol(self, websocket: WebSocket):
         """Disconnect a protocol websocket"""
-        if websocket in self.protocol_connections:
-            self.protocol_connections.remove(websocket)
-            logger.info(f"Protocol WebSocket disconnected. Remaining connections: {len(self.protocol_connections)}")
+        self.disconnect("protocol", websocket)
 
     def disconnect_dashboard(self, websocket: WebSocket):
         """Disconnect a dashboard websocket"""
-        if websocket in self.dashboard_connections:
-            self.dashboard_connections.remove(websocket)
-            logger.info(f"Dashboard WebSocket disconnected. Remaining connections: {len(self.dashboard_connections)}")
+        self.disconnect("dashboard", websocket)
 
     def disconnect_alarm(self, websocket: WebSocket):
         """Disconnect an alarm websocket"""
-        if websocket in self.alarm_connections:
-            self.alarm_connections.remove(websocket)
-            logger.info(f"Alarm WebSocket disconnected. Remaining connections: {len(self.alarm_connections)}")
+        self.disconnect("alarm", websocket)
+
+    def disconnect_command(self, websocket: WebSocket):
+        """Disconnect a command websocket"""
+        self.disconnect("command", websocket)
+
+    async def receive(self, channel: str, websocket: WebSocket) -> Optional[str]:
+        """
+        Next client message, pongs are consumed here. None if the client disconnected
+        or stayed silent for longer than idle_timeout (half-open connection).
+        """
+        while True:
+            try:
+                text = await asyncio.wait_for(websocket.receive_text(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                logger.info(f"{channel.capitalize()} WebSocket idle for {self.idle_timeout}s, closing")
+                await self._close(websocket, 1001, "Idle timeout")
+                return None
+            except WebSocketDisconnect:
+                return None
+
+            connection = self.connections[channel].get(websocket)
+            now = time.monotonic()
+            if connection is not None:
+                connection.last_seen = now
+            if '"pong"' not in text:
+                return text
+            try:
+                message = json.loads(text)
+            except ValueError:
+                return text
+            if message.get("type") != "pong":
+                return text
+            if connection is not None and isinstance(message.get("ts"), (int, float)):
+                connection.rtt = max(0.0, time.time() - message["ts"])
+
+    async def heartbeat(self):
+        """Scheduler job: drop connections idle for longer than idle_timeout, ping the others"""
+        now = time.monotonic()
+        for channel, connections in self.connections.items():
+            idle = [connection for connection in connections.values() if now - connection.last_seen > self.idle_timeout]
+            for connection in idle:
+                self.reaped += 1
+                self.disconnect(channel, connection.websocket)
+            await asyncio.gather(*(self._close(connection.websocket, 1001, "Idle timeout") for connection in idle))
+
+        text = json.dumps({"type": "ping", "ts": time.time()})
+        for channel in CHANNELS:
+            await self._send_all(channel, text)
+
+    async def _close(self, websocket: WebSocket, code: int, reason: str):
+        try:
+            await asyncio.wait_for(websocket.close(code=code, reason=reason), self.send_timeout)
+        except Exception as e:
+            logger.debug(f"Error closing websocket: {e}")
+
+    async def _send(self, connection: Connection, text: str) -> bool:
+        try:
+            await asyncio.wait_for(connection.websocket.send_text(text), self.send_timeout)
+            connection.messages_sent += 1
+            return True
+        except Exception as e:
+            logger.error(f"Error sending {connection.channel} message: {e!r}")
+            return False
+
+    async def send(self, channel: str, websocket: WebSocket, text: str) -> bool:
+        """Send to one registered websocket with the send timeout; False if it is gone or the send failed"""
+        connection = self.connections[channel].get(websocket)
+        if connection is None:
+            return False
+        return await self._send(connection, text)
+
+    async def _send_all(self, channel: str, text: str):
+        """Send to all connections of a channel concurrently, close and remove broken or stalled ones"""
+        connections = list(self.connections[channel].values())
+        if not connections:
+            return
+        results = await asyncio.gather(*(self._send(connection, text) for connection in connections))
+        dropped = [connection for connection, sent in zip(connections, results) if not sent]
+        for connection in dropped:
+            self.disconnect(channel, connection.websocket)
+        # schließen, damit der Browser sofort neu verbindet; nach einem abgebrochenen
+        # send_text ist der Stream ohnehin nicht mehr nutzbar
+        await asyncio.gather(*(self._close(connection.websocket, 1011, "Send failed") for connection in dropped))
 
     async def broadcast_protocol_entry(self, log_entry: Dict):
         """Broadcast a new protocol entry to all connected protocol clients"""
-        if not self.protocol_connections:
+        if not self.connections["protocol"]:
             return
 
         message = {
             "type": "new_entry",
             "data": log_entry
         }
-
-        # Send to all connections, remove broken ones
-        disconnected = []
-        for connection in self.protocol_connections:
-            try:
-                await connection.send_text(json.dumps(message))
-            except Exception as e:
-                logger.error(f"Error sending protocol message: {e}")
-                disconnected.append(connection)
-
-        # Remove disconnected clients
-        for conn in disconnected:
-            self.disconnect_protocol(conn)
+        await self._send_all("protocol", json.dumps(message))
 
     async def broadcast_dashboard_values(self, values_data: List[Dict]):
         """Broadcast updated dashboard values to all connected dashboard clients"""
-        if not self.dashboard_connections:
+        if not self.connections["dashboard"]:
             return
 
         message = {
             "type": "values_update",
             "data": values_data
         }
-
-        # Send to all connections, remove broken ones
-        disconnected = []
-        for connection in self.dashboard_connections:
-            try:
-                await connection.send_text(json.dumps(message))
-            except Exception as e:
-                logger.error(f"Error sending dashboard message: {e}")
-                disconnected.append(connection)
-
-        # Remove disconnected clients
-        for conn in disconnected:
-            self.disconnect_dashboard(conn)
+        await self._send_all("dashboard", json.dumps(message))
 
     async def send_initial_protocol_data(self, websocket: WebSocket, entries: List[Dict]):
         """Send initial protocol data to a newly connected client"""
@@ -119,26 +250,14 @@ class WebSocketManager:
 
     async def broadcast_alarm_update(self, alarms_data: List[Dict]):
         """Broadcast new or updated alarm data to all connected alarm clients"""
-        if not self.alarm_connections:
+        if not self.connections["alarm"]:
             return
 
         message = {
             "type": "alarm_update",
             "data": {"alarms": alarms_data}
         }
-
-        # Send to all connections, remove broken ones
-        disconnected = []
-        for connection in self.alarm_connections:
-            try:
-                await connection.send_text(json.dumps(message))
-            except Exception as e:
-                logger.error(f"Error sending alarm message: {e}")
-                disconnected.append(connection)
-
-        # Remove disconnected clients
-        for conn in disconnected:
-            self.disconnect_alarm(conn)
+        await self._send_all("alarm", json.dumps(message))
 
     async def send_initial_alarm_data(self, websocket: WebSocket, alarms_data: List[Dict]):
         """Send initial alarm data to a newly connected client"""
@@ -149,4 +268,21 @@ class WebSocketManager:
         try:
             await websocket.send_text(json.dumps(message))
         except Exception as e:
-            logger.error(f"Error sending initial alarm data: {e}")
\ No newline at end of file
+            logger.error(f"Error sending initial alarm data: {e}")
+
+    def get_stats(self) -> Dict:
+        now = time.monotonic()
+        return {
+            "connections": {channel: len(connections) for channel, connections in self.connections.items()},
+            "clients": len(self.clients),
+            "max_connections": self.max_connections,
+            "rejected": self.rejected,
+            "reaped": self.reaped,
+            "idle_max_s": round(max((now - connection.last_seen for connections in self.connections.values()
+                                     for connection in connections.values()), default=0.0), 1)
+        }
+
+    def get_connections(self) -> List[Dict]:
+        now = time.monotonic()
+        return [connection.to_json(now) for connections in self.connections.values()
+                for connection in connections.values()]
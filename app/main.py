@@ -1,5 +1,7 @@
 import asyncio
 import logging
+import time
+from datetime import datetime, timezone
 
 from fastapi import FastAPI
 from fastapi.responses import RedirectResponse
@@ -7,19 +9,34 @@ from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 
 from fastapi.templating import Jinja2Templates
+from typing import Awaitable, Dict, Optional
 
 from api.protocol import Protocol
 from api.alarm import AlarmApi
+from core.config import Config
+from core.change_tracker import ChangeTracker
+from core.diagnostics import LoopMonitor
 from core.database_manager import DatabaseManager
 from api.dashboard import Dashboard
+from api.command import CommandApi
+from api.history import HistoryApi
+from api.diagnostics import DiagnosticsApi
+from api.rest import RestApi
 from core.event_manager import EventManager
+from core.event_queue import EventQueue
+from core.command_manager import CommandManager
 from core.websocket_manager import WebSocketManager
-from core.cycle_manager import CycleManager
+from core.scheduler import Scheduler
 from plugins.plugin_manager import PluginManager
 from core.log_handler import LogHandler
 from core.alarm_handler import AlarmHandler
+from core.alarm_engine import AlarmEngine
+from core.watchdog import Watchdog
 from core.value_handler import ValueHandler
+from core.value_filter import ValueFilter
 from core.event_type import EventType
+from core.history_store import HistoryStore
+from services.device_service import DeviceService
 
 
 def setup_logging(level=logging.INFO):
@@ -45,67 +62,190 @@ def setup_logging(level=logging.INFO):
 
 logger = setup_logging(logging.INFO)
 
-templates: Jinja2Templates = Jinja2Templates(directory="templates")
 
-
-database_manager = DatabaseManager()
-
-websocket_manager = WebSocketManager()
-
-event_queue: asyncio.Queue = asyncio.Queue()
-
-dashboard = Dashboard(websocket_manager, database_manager, templates)
-
-protocol = Protocol(websocket_manager, database_manager, templates)
-
-alarm_api = AlarmApi(websocket_manager, database_manager, event_queue, templates)
-
-log_handler = LogHandler(database_manager, websocket_manager)
-alarm_handler = AlarmHandler(database_manager, websocket_manager)
-value_handler = ValueHandler(event_queue, database_manager, websocket_manager)
-
-plugin_manager = PluginManager(event_queue)
-plugin_manager.load()
-
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-
-    logger.info("Start cycle manager & event manager task ...")
-    stop_event = asyncio.Event()
-    cycle_manager = CycleManager(stop_event, event_queue, interval=60)
-    event_manager = EventManager(stop_event, event_queue, plugin_manager)
-    event_manager.register_event_handler([EventType.LOG], log_handler)
-    event_manager.register_event_handler([EventType.ALARM, EventType.ALARM_ACKNOWLEDGE], alarm_handler)
-    event_manager.register_event_handler([EventType.VALUE], value_handler)
-
-    cycle_task = asyncio.create_task(cycle_manager.run())
-    event_task = asyncio.create_task(event_manager.run())
-
-    logger.info("Tasks started")
-    try:
-        yield
-    finally:
-        logger.info("Stopping tasks...")
-        stop_event.set()
-        await cycle_task
-        await event_task
-        logger.info("Tasks stopped")
-        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
-        print("Noch laufende Tasks:", tasks)
-
-
-app = FastAPI(title="Haussteuerung Dashboard", lifespan=lifespan)
-
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-# Include routers
-app.include_router(dashboard.router)
-app.include_router(protocol.router)
-app.include_router(alarm_api.router)
-
-
-@app.get("/")
-async def redirect():
-    # redirect to /dashboard
-    return RedirectResponse(url="/dashboard")
+class StartupTimer:
+    """Duration of the startup phases in ms, logged and kept in app.state.startup_timings"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    async def timed(self, name: str, awaitable: Awaitable):
+        started = time.perf_counter()
+        result = await awaitable
+        self.timings[name] = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Startup phase {name}: {self.timings[name]} ms")
+        return result
+
+    def finish(self) -> Dict[str, float]:
+        self.timings["total"] = round((time.perf_counter() - self.started) * 1000, 1)
+        return self.timings
+
+
+async def wait_for_database(database_manager: DatabaseManager, config: Config):
+    """Connect and check the schema, retrying until startup_timeout while the database is not reachable"""
+    deadline = time.monotonic() + config.startup_timeout
+    while True:
+        try:
+            await asyncio.to_thread(database_manager.connect)
+            return
+        except Exception as e:
+            if time.monotonic() >= deadline:
+                raise
+            logger.warning(f"Database not available ({e}), retrying in {config.startup_retry_interval}s")
+            await asyncio.sleep(config.startup_retry_interval)
+
+
+def create_app(config: Optional[Config] = None) -> FastAPI:
+    """
+    Build the app. Only cheap objects are created here; connecting to the database,
+    loading plugins and warming up the caches happens in lifespan.
+    """
+    config = config or Config.from_env()
+    templates = Jinja2Templates(directory=config.templates_dir)
+
+    database_manager = DatabaseManager(config.database_url, config.read_database_urls, config.max_replica_lag)
+    websocket_manager = WebSocketManager(config.ws_max_connections, config.ws_max_connections_per_client,
+                                         heartbeat_interval=config.ws_heartbeat_interval,
+                                         idle_timeout=config.ws_idle_timeout)
+    change_tracker = ChangeTracker()  # Versionen für die ETags der REST-API
+    device_service = DeviceService(database_manager, change_tracker)
+    event_queue: EventQueue = EventQueue()
+
+    dashboard = Dashboard(websocket_manager, database_manager, device_service, templates)
+    protocol = Protocol(websocket_manager, database_manager, templates)
+    alarm_api = AlarmApi(websocket_manager, database_manager, event_queue, templates)
+
+    log_handler = LogHandler(database_manager, websocket_manager, change_tracker)
+    alarm_handler = AlarmHandler(database_manager, websocket_manager, change_tracker)
+    value_filter = ValueFilter(database_manager)
+    value_handler = ValueHandler(event_queue, database_manager, websocket_manager, device_service, value_filter)
+    plugin_manager = PluginManager(event_queue)
+    alarm_engine = AlarmEngine(event_queue, database_manager)
+    watchdog = Watchdog(event_queue, device_service, websocket_manager)
+
+    command_manager = CommandManager(event_queue, device_service)
+    command_api = CommandApi(command_manager, websocket_manager)
+    # optional: DuckDB-Kopie der Werte für Auswertungen (DUCKDB_PATH=/data/history.duckdb)
+    history_store = HistoryStore(config.duckdb_path, database_manager) if config.duckdb_path else None
+    history_api = HistoryApi(database_manager, history_store)
+    rest_api = RestApi(device_service, database_manager, change_tracker)
+    loop_monitor = LoopMonitor()  # zur Laufzeit über /admin/diagnostics/slow-callbacks schaltbar
+    diagnostics_api = DiagnosticsApi(config.admin_token, loop_monitor)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+
+        logger.info("Starting ...")
+        timer = StartupTimer()
+        # Datenbank und Plugins unabhängig voneinander, danach die Caches parallel füllen
+        await asyncio.gather(
+            timer.timed("database", wait_for_database(database_manager, config)),
+            timer.timed("plugins", asyncio.to_thread(plugin_manager.load))
+        )
+        warm_up = [
+            timer.timed("devices", asyncio.to_thread(device_service.load)),
+            timer.timed("value_filter", asyncio.to_thread(value_filter.load)),
+            timer.timed("alarm_rules", asyncio.to_thread(alarm_engine.load, plugin_manager.get_alarm_rules()))
+        ]
+        if history_store is not None:
+            warm_up.append(timer.timed("history_store", asyncio.to_thread(history_store.open)))
+        await asyncio.gather(*warm_up)
+        value_filter.seed(device_service.latest_values.values())
+        await timer.timed("plugin_devices", asyncio.to_thread(
+            device_service.register_plugin_devices, plugin_manager.get_devices()))
+        await timer.timed("watchdog", asyncio.to_thread(
+            watchdog.load, {plugin.name: plugin.poll_interval for plugin in plugin_manager.plugins},
+            alarm_engine.active_devices(Watchdog.alarm_type)))
+
+        stop_event = asyncio.Event()
+        scheduler = Scheduler(stop_event)
+        event_manager = EventManager(stop_event, event_queue, plugin_manager)
+        event_manager.register_event_handler([EventType.LOG], log_handler)
+        event_manager.register_event_handler([EventType.ALARM, EventType.ALARM_ACKNOWLEDGE], alarm_handler)
+        event_manager.register_event_handler([EventType.VALUE, EventType.VALUE_BATCH], value_handler)
+        event_manager.register_event_handler([EventType.VALUE, EventType.VALUE_BATCH], alarm_engine)
+        event_manager.register_event_handler([EventType.VALUE, EventType.VALUE_BATCH], watchdog)
+        event_manager.register_event_handler([EventType.COMMAND_ACK], command_manager)
+
+        async def emit_cycle():
+            payload = {
+                "type": "60_seconds",
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+            }
+            await event_queue.put((EventType.CYCLE, payload))
+
+        scheduler.add_interval("cycle_60_seconds", 60, emit_cycle)
+        scheduler.add_interval("alarm_stale_check", 10, alarm_engine.check_stale)
+        scheduler.add_interval("watchdog", watchdog.wheel.tick, watchdog.check)
+        scheduler.add_interval("websocket_heartbeat", websocket_manager.heartbeat_interval, websocket_manager.heartbeat)
+        plugin_manager.register_polls(scheduler)
+        if database_manager.replicas:
+            async def check_replicas():
+                await asyncio.to_thread(database_manager.check_replicas)
+            scheduler.add_interval("replica_lag", 15, check_replicas)
+        if history_store is not None:
+            async def sync_history():
+                await asyncio.to_thread(history_store.sync)
+            scheduler.add_interval("history_sync", 60, sync_history)
+        app.state.scheduler = scheduler  # Lateness-Metriken über scheduler.get_stats()
+        app.state.event_manager = event_manager
+
+        scheduler_task = asyncio.create_task(scheduler.run())
+        event_task = asyncio.create_task(event_manager.run())
+
+        app.state.startup_timings = timer.finish()
+        logger.info(f"Tasks started, startup took {app.state.startup_timings['total']} ms")
+        try:
+            yield
+        finally:
+            logger.info("Stopping tasks...")
+            stop_event.set()
+            await loop_monitor.stop()
+            await scheduler_task
+            await event_task
+            if history_store is not None:
+                history_store.close()
+            logger.info("Tasks stopped")
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            logger.debug(f"Noch laufende Tasks: {tasks}")
+
+    app = FastAPI(title="Haussteuerung Dashboard", lifespan=lifespan)
+
+    # Dienste für Benchmark, Diagnose und Tests
+    app.state.config = config
+    app.state.database_manager = database_manager
+    app.state.websocket_manager = websocket_manager
+    app.state.device_service = device_service
+    app.state.event_queue = event_queue
+    app.state.dashboard = dashboard
+    app.state.value_handler = value_handler
+    app.state.plugin_manager = plugin_manager
+    app.state.alarm_engine = alarm_engine
+    app.state.watchdog = watchdog
+    app.state.command_manager = command_manager
+    app.state.history_store = history_store
+    app.state.value_filter = value_filter
+    app.state.change_tracker = change_tracker
+    app.state.loop_monitor = loop_monitor
+
+    app.mount("/static", StaticFiles(directory=config.static_dir), name="static")
+
+    # Include routers
+    app.include_router(dashboard.router)
+    app.include_router(protocol.router)
+    app.include_router(alarm_api.router)
+    app.include_router(command_api.router)
+    app.include_router(history_api.router)
+    app.include_router(rest_api.router)
+    app.include_router(diagnostics_api.router)
+
+    @app.get("/")
+    async def redirect():
+        # redirect to /dashboard
+        return RedirectResponse(url="/dashboard")
+
+    return app
+
+
+app = create_app()
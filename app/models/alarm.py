@@ -1,5 +1,6 @@
 from sqlalchemy import Column, Integer, String, DateTime, Boolean
 from core.database_manager import Base
+from core.serialization import format_timestamp, parse_timestamp
 import datetime
 
 
@@ -17,17 +18,14 @@ class Alarm(Base):
 
     @classmethod
     def from_dict(cls, data: dict):
-        if "timestamp" in data and isinstance(data["timestamp"], str):
-            import datetime
-            data["timestamp"] = datetime.datetime.fromisoformat(data["timestamp"])
-        return cls(**data)
+        return cls(**parse_timestamp(data))
 
     def to_json(self):
         return {
             "id": self.id,
             "active": self.active,
             "acknowledged": self.acknowledged,
-            "timestamp": self.timestamp.isoformat(),
+            "timestamp": format_timestamp(self.timestamp),
             "message": self.message,
             "alarm_type": self.alarm_type,
             "device_id": self.device_id,
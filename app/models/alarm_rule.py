@@ -0,0 +1,32 @@
+from sqlalchemy import Boolean, Column, Float, Integer, String
+from core.database_manager import Base
+
+
+class AlarmRule(Base):
+    __tablename__ = "alarm_rules"
+    id = Column(Integer, primary_key=True, index=True)
+    device_id = Column(String(255), nullable=True, index=True)  # NULL = alle Geräte mit value_type
+    value_type = Column(String(255), nullable=True)
+    rule_type = Column(String(50), nullable=False)  # threshold_above, threshold_below, rate_of_change, stale
+    threshold = Column(Float, nullable=True)  # Grenzwert bzw. maximale Änderung pro Minute
+    hysteresis = Column(Float, nullable=False, default=0.0)
+    timeout = Column(Float, nullable=True)  # Sekunden ohne neuen Wert (stale)
+    alarm_type = Column(String(100), nullable=False)
+    message = Column(String(500), nullable=True)  # Platzhalter: {device_id} {value} {previous} {threshold} {timeout}
+    priority = Column(Integer, default=0)  # 0=niedrig, 1=mittel, 2=hoch, 3=kritisch
+    enabled = Column(Boolean, nullable=False, default=True)
+
+    def to_json(self):
+        return {
+            "id": self.id,
+            "device_id": self.device_id,
+            "value_type": self.value_type,
+            "rule_type": self.rule_type,
+            "threshold": self.threshold,
+            "hysteresis": self.hysteresis,
+            "timeout": self.timeout,
+            "alarm_type": self.alarm_type,
+            "message": self.message,
+            "priority": self.priority,
+            "enabled": self.enabled
+        }
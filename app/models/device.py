@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Float, String
+from core.database_manager import Base
+
+
+class Device(Base):
+    __tablename__ = "devices"
+    id = Column(String(255), primary_key=True, index=True)
+    name = Column(String(255))
+    device_type = Column(String(100))
+    group_id = Column(String(255), nullable=True, index=True)
+    plugin = Column(String(100), nullable=True)  # Plugin, das das Gerät steuert
+    report_interval = Column(Float, nullable=True)  # erwartetes Meldeintervall in Sekunden (Watchdog)
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**data)
+
+    def to_json(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "device_type": self.device_type,
+            "group_id": self.group_id,
+            "plugin": self.plugin,
+            "report_interval": self.report_interval
+        }
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String
+from core.database_manager import Base
+
+
+class DeviceGroup(Base):
+    __tablename__ = "device_groups"
+    id = Column(String(255), primary_key=True, index=True)
+    name = Column(String(255))
+    sort_order = Column(Integer, default=0)
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**data)
+
+    def to_json(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "sort_order": self.sort_order
+        }
@@ -1,10 +1,17 @@
-from sqlalchemy import Column, Integer, DateTime, String, ForeignKey
+from sqlalchemy import Column, Integer, DateTime, String, ForeignKey, Index
 from core.database_manager import Base
+from core.serialization import format_timestamp, parse_timestamp
 import datetime
 
 
 class Log(Base):
     __tablename__ = "logs"
+    # wie changelog-008; die GIN-Indizes für die Volltextsuche gibt es nur unter PostgreSQL (Liquibase)
+    __table_args__ = (
+        Index("ix_logs_timestamp", "timestamp", "id"),
+        Index("ix_logs_ref_id_timestamp", "ref_id", "timestamp"),
+        Index("ix_logs_protocol_level_timestamp", "protocol", "level", "timestamp"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     timestamp = Column(DateTime, default=datetime.datetime.utcnow)
     message = Column(String)
@@ -14,15 +21,12 @@ class Log(Base):
 
     @classmethod
     def from_dict(cls, data: dict):
-        if "timestamp" in data and isinstance(data["timestamp"], str):
-            import datetime
-            data["timestamp"] = datetime.datetime.fromisoformat(data["timestamp"])
-        return cls(**data)
+        return cls(**parse_timestamp(data))
 
     def to_json(self):
         return {
             "id": self.id,
-            "timestamp": self.timestamp.isoformat() if self.timestamp else None,
+            "timestamp": format_timestamp(self.timestamp),
             "message": self.message,
             "protocol": self.protocol,
             "level": self.level,
@@ -1,6 +1,7 @@
 from sqlalchemy import Column, String, DateTime, JSON
 import datetime
 from core.database_manager import Base
+from core.serialization import format_timestamp, parse_timestamp
 
 
 class Value(Base):
@@ -10,18 +11,17 @@ class Value(Base):
     value_type = Column(String, nullable=False)
     value = Column(String, nullable=False)
     unit = Column(String, nullable=True)
+    # Einfügezeitpunkt (UTC), monoton im Gegensatz zum Gerätezeitstempel; Wasserzeichen des Verlaufsspeichers
+    inserted_at = Column(DateTime, nullable=True, index=True, default=datetime.datetime.utcnow)
 
     @classmethod
     def from_dict(cls, data: dict):
-        if "timestamp" in data and isinstance(data["timestamp"], str):
-            import datetime
-            data["timestamp"] = datetime.datetime.fromisoformat(data["timestamp"])
-        return cls(**data)
+        return cls(**parse_timestamp(data))
 
     def to_json(self):
         return {
             "id": self.id,
-            "timestamp": self.timestamp.isoformat() if self.timestamp else None,
+            "timestamp": format_timestamp(self.timestamp),
             "value_type": self.value_type,
             "value": self.value,
             "unit": self.unit
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Float, Integer, String
+from core.database_manager import Base
+
+
+class ValueFilterRule(Base):
+    __tablename__ = "value_filters"
+    id = Column(Integer, primary_key=True, index=True)
+    device_id = Column(String(255), nullable=True)  # NULL = alle Geräte
+    value_type = Column(String(255), nullable=True)  # NULL = alle Werttypen
+    deadband = Column(Float, nullable=False, default=0.0)  # minimale Änderung (absolut)
+    min_interval = Column(Float, nullable=False, default=0.0)  # Sekunden zwischen zwei gespeicherten Änderungen
+    max_interval = Column(Float, nullable=False, default=900.0)  # Sekunden bis zum Heartbeat
+
+    def to_json(self):
+        return {
+            "id": self.id,
+            "device_id": self.device_id,
+            "value_type": self.value_type,
+            "deadband": self.deadband,
+            "min_interval": self.min_interval,
+            "max_interval": self.max_interval
+        }
@@ -9,6 +9,12 @@ logger = logging.getLogger(__name__)
 
 class Meross(Plugin):
 
+    name = "meross"
+    poll_interval = 60
+
+    async def poll(self):
+        logger.info("Meross plugin polling devices")
+
     async def trigger(self, event_type: EventType, payload: dict):
         logger.info(f"Meross plugin triggered with {event_type} and payload: {payload}")
 
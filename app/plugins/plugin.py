@@ -1,18 +1,39 @@
 from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
 from core.event_type import EventType
 
 
 class Plugin(ABC):
 
+    name = "plugin"  # eindeutiger Name, wird als Besitzer im Geräteregister gespeichert
+
+    poll_interval: Optional[float] = None  # Sekunden, None = kein Polling
+    poll_offset: Optional[float] = None  # None = automatisch gestaffelt
+    poll_jitter: float = 1.0
+
     _manager = None
 
     def set_manager(self, manager):
         self._manager = manager
 
     def can_handle(self, event_type: EventType) -> bool:
-        if event_type == EventType.CYCLE:
-            return True
-        return False  # Default implementation, ignore all other Events
+        return False  # Default implementation, ignore all Events (polling runs via poll())
+
+    async def poll(self):
+        """Called every poll_interval seconds by the scheduler"""
+        pass
+
+    def get_devices(self) -> List[Dict]:
+        """Devices provided by this plugin (id, name, device_type, group_id)"""
+        return []
+
+    def get_alarm_rules(self) -> List[Dict]:
+        """Alarm rules for the plugin's devices (same fields as the alarm_rules table)"""
+        return []
+
+    async def handle_command(self, device_id: str, command: str, args: dict) -> dict:
+        """Execute a command for one of the plugin's devices and return the result"""
+        raise NotImplementedError(f"Plugin {self.name} does not support commands")
 
     @abstractmethod
     async def trigger(self, event_type: EventType, payload: dict):
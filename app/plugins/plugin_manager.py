@@ -1,9 +1,11 @@
 import asyncio
 import queue
-from typing import List
+from datetime import datetime, timezone
+from typing import Dict, List
 import logging
 
 from core.event_type import EventType
+from core.scheduler import Scheduler
 from .plugin import Plugin
 from .meross import Meross
 from .simulator import Simulator
@@ -15,7 +17,11 @@ class PluginManager:
 
     def __init__(self, queue: queue.Queue):
         self.plugins: List[Plugin] = []
+        self.plugins_by_name: Dict[str, Plugin] = {}
+        self.handlers: Dict[EventType, List[Plugin]] = {}  # can_handle wird nur einmal beim Laden ausgewertet
         self.queue = queue
+        self._command_tasks = set()
+        self._poll_tasks: Dict[str, asyncio.Task] = {}  # laufender Poll je Plugin
 
     def load(self):
         self.plugins.append(Meross())
@@ -23,14 +29,108 @@ class PluginManager:
 
         for plugin in self.plugins:
             plugin.set_manager(self)
+            self.plugins_by_name[plugin.name] = plugin
 
-    async def trigger(self, event_type, payload):
+        for event_type in EventType:
+            self.handlers[event_type] = [plugin for plugin in self.plugins if plugin.can_handle(event_type)]
+
+    def register_polls(self, scheduler: Scheduler):
+        """
+        Register one poll job per plugin. Plugins sharing an interval are staggered
+        evenly across it unless they define a fixed poll_offset.
+        """
+        by_interval: Dict[float, List[Plugin]] = {}
         for plugin in self.plugins:
+            if plugin.poll_interval:
+                by_interval.setdefault(plugin.poll_interval, []).append(plugin)
+
+        for interval, plugins in by_interval.items():
+            for index, plugin in enumerate(plugins):
+                offset = plugin.poll_offset if plugin.poll_offset is not None else interval * index / len(plugins)
+                scheduler.add_interval(f"poll_{plugin.name}", interval, self._poll_callback(plugin),
+                                       offset=offset, jitter=plugin.poll_jitter)
+                logger.info(f"Plugin {plugin.name} polls every {interval}s (offset {offset:.1f}s)")
+
+    def _poll_callback(self, plugin: Plugin):
+        async def poll():
+            await self.put_event(EventType.POLL, {
+                "plugin": plugin.name,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            })
+        return poll
+
+    def get_plugin(self, name: str) -> Plugin:
+        return self.plugins_by_name.get(name)
+
+    def get_devices(self) -> List[Dict]:
+        """Devices of all plugins, tagged with the owning plugin"""
+        devices = []
+        for plugin in self.plugins:
+            for device in plugin.get_devices():
+                devices.append({**device, "plugin": plugin.name})
+        return devices
+
+    def get_alarm_rules(self) -> List[Dict]:
+        """Alarm rules declared by all plugins"""
+        return [rule for plugin in self.plugins for rule in plugin.get_alarm_rules()]
+
+    async def trigger(self, event_type, payload):
+        if event_type == EventType.COMMAND:
+            # Kommandos nur an das besitzende Plugin, ohne die Event-Schleife zu blockieren
+            task = asyncio.create_task(self.execute_command(payload))
+            self._command_tasks.add(task)
+            task.add_done_callback(self._command_tasks.discard)
+            return
+
+        if event_type == EventType.POLL:
+            # Polling nur für das Plugin, dessen Job fällig ist; als eigene Task, ein langsames
+            # Gerät hält sonst alle Lanes auf (auch Alarme und Kommandos)
+            plugin = self.get_plugin(payload.get("plugin"))
+            if plugin is None:
+                return
+            running = self._poll_tasks.get(plugin.name)
+            if running is not None and not running.done():
+                logger.warning(f"Plugin {plugin.name} is still polling, skipping this poll")
+                return
+            self._poll_tasks[plugin.name] = asyncio.create_task(self._poll(plugin))
+            return
+
+        for plugin in self.handlers.get(event_type, []):
             try:
-                if plugin.can_handle(event_type):
-                    await plugin.trigger(event_type, payload)
+                await plugin.trigger(event_type, payload)
             except Exception as e:
                 logger.exception(f"Plugin raised Exception {e}")
 
+    @staticmethod
+    async def _poll(plugin: Plugin):
+        try:
+            await plugin.poll()
+        except Exception as e:
+            logger.exception(f"Plugin {plugin.name} poll raised Exception {e}")
+
+    async def execute_command(self, payload: dict):
+        ack = {
+            "correlation_id": payload.get("correlation_id"),
+            "device_id": payload.get("device_id"),
+            "plugin": payload.get("plugin")
+        }
+        plugin = self.get_plugin(payload.get("plugin"))
+        if plugin is None:
+            ack.update({"status": "error", "error": f"Plugin {payload.get('plugin')} not loaded"})
+        else:
+            try:
+                result = await plugin.handle_command(payload["device_id"], payload["command"], payload.get("args", {}))
+                ack.update({"status": "ok", "result": result})
+            except Exception as e:
+                logger.exception(f"Plugin {plugin.name} failed to execute command: {e}")
+                ack.update({"status": "error", "error": str(e)})
+
+        await self.put_event(EventType.COMMAND_ACK, ack)
+
     async def put_event(self, event_type: EventType, payload: dict):
         await self.queue.put((event_type, payload))
+
+    async def put_values(self, values: List[dict], batch_size: int = 500):
+        """Put many values as VALUE_BATCH events (one queue entry per batch instead of per value)"""
+        for start in range(0, len(values), batch_size):
+            await self.queue.put((EventType.VALUE_BATCH, {"values": values[start:start + batch_size]}))
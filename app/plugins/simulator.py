@@ -1,7 +1,9 @@
 import logging
-from datetime import datetime, timezone
-
-from sqlalchemy import values
+import math
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
 
 from core.event_type import EventType
 from .plugin import Plugin
@@ -10,22 +12,208 @@ from .plugin import Plugin
 logger = logging.getLogger(__name__)
 
 
-class Simulator(Plugin):
+class SimulatedDevice:
+    """Base class for a simulated device producing one value type"""
+
+    value_type = None
+    unit = None
+    device_type = None
+
+    def __init__(self, device_id: str, name: str):
+        self.id = device_id
+        self.name = name
+
+    def next_value(self, now: datetime) -> str:
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    def to_device(self) -> Dict:
+        return {"id": self.id, "name": self.name, "device_type": self.device_type, "group_id": "simulation"}
+
+    def to_value(self, now: datetime) -> Dict:
+        return {
+            "id": self.id,
+            "value_type": self.value_type,
+            "value": self.next_value(now),
+            "unit": self.unit,
+            "timestamp": now.isoformat()
+        }
+
+
+class SawtoothTemperature(SimulatedDevice):
+    """The original simulated sensor: cycles between 20.0 and 22.0 °C"""
+
+    value_type = "temperature"
+    unit = "°C"
+    device_type = "temperature"
+
+    def __init__(self, device_id: str, name: str):
+        super().__init__(device_id, name)
+        self._cnt = 0
+        self.value = None
+
+    def next_value(self, now: datetime) -> str:
+        self._cnt += 1
+        self.value = (self._cnt + 18) % 20 * 0.1 + 20  # cycles between 20.0 and 22.0
+        return f"{self.value:.1f}"
+
+
+class TemperatureSensor(SimulatedDevice):
+    """Daily sine around a base temperature plus slow drift and sensor noise"""
+
+    value_type = "temperature"
+    unit = "°C"
+    device_type = "temperature"
+
+    def __init__(self, device_id: str, name: str, base: float, amplitude: float, noise: float):
+        super().__init__(device_id, name)
+        self.base = base
+        self.amplitude = amplitude
+        self.noise = noise
+        self.drift = 0.0
+        self.phase = random.uniform(0, 2 * math.pi)
+
+    def next_value(self, now: datetime) -> str:
+        day_fraction = (now.hour * 3600 + now.minute * 60 + now.second) / 86400
+        self.drift = max(-1.0, min(1.0, self.drift + random.gauss(0, 0.02)))
+        value = self.base + self.amplitude * math.sin(2 * math.pi * day_fraction + self.phase) \
+            + self.drift + random.gauss(0, self.noise)
+        return f"{value:.2f}"
+
 
-    def can_handle(self, event_type: EventType) -> bool:
-        if event_type in [EventType.CYCLE, EventType.VALUE_CHANGED]:
-            return True
-        return False
+class SwitchDevice(SimulatedDevice):
+    """Smart plug that toggles its state now and then"""
+
+    value_type = "state"
+    device_type = "switch"
+
+    def __init__(self, device_id: str, name: str, toggle_probability: float = 0.05):
+        super().__init__(device_id, name)
+        self.toggle_probability = toggle_probability
+        self.state = random.choice(["on", "off"])
+
+    def next_value(self, now: datetime) -> str:
+        if random.random() < self.toggle_probability:
+            self.state = "off" if self.state == "on" else "on"
+        return self.state
+
+
+class PowerMeter(SimulatedDevice):
+    """Power meter with a base load, relative noise and occasional load spikes"""
+
+    value_type = "power"
+    unit = "W"
+    device_type = "power"
+
+    def __init__(self, device_id: str, name: str):
+        super().__init__(device_id, name)
+        self.base_load = random.uniform(50, 2000)
+
+    def next_value(self, now: datetime) -> str:
+        load = self.base_load * random.gauss(1.0, 0.02)
+        if random.random() < 0.01:
+            load *= random.uniform(2, 4)  # Anlaufstrom / Lastspitze
+        return f"{max(0.0, load):.1f}"
+
+
+def _env(name: str, default, cast=int):
+    value = os.getenv(name)
+    return cast(value) if value not in (None, "") else default
+
+
+class Simulator(Plugin):
+    """
+    Simulated device fleet for local load tests.
+
+    Configured via environment variables (defaults reproduce the single simulated sensor):
+    SIMULATOR_TEMPERATURE_SENSORS, SIMULATOR_SWITCHES, SIMULATOR_POWER_METERS,
+    SIMULATOR_FLAPPING_RATIO (share of temperature sensors oscillating around the alarm threshold),
+    SIMULATOR_BURST_PROBABILITY, SIMULATOR_BURST_FRACTION, SIMULATOR_BURST_SIZE (extra samples per
+    device during a burst), SIMULATOR_BATCH_SIZE and SIMULATOR_POLL_INTERVAL.
+    """
+
+    name = "simulator"
+    poll_interval = 60
+
+    alarm_threshold = 21.0  # Alarm if temperature > 21.0°C
+
+    def __init__(self):
+        self.poll_interval = _env("SIMULATOR_POLL_INTERVAL", 60, float)
+        self.batch_size = _env("SIMULATOR_BATCH_SIZE", 500)
+        self.burst_probability = _env("SIMULATOR_BURST_PROBABILITY", 0.0, float)
+        self.burst_fraction = _env("SIMULATOR_BURST_FRACTION", 0.1, float)
+        self.burst_size = _env("SIMULATOR_BURST_SIZE", 5)
+
+        temperature_sensors = _env("SIMULATOR_TEMPERATURE_SENSORS", 1)
+        switches = _env("SIMULATOR_SWITCHES", 0)
+        power_meters = _env("SIMULATOR_POWER_METERS", 0)
+        flapping = int(temperature_sensors * _env("SIMULATOR_FLAPPING_RATIO", 0.0, float))
+
+        self.fleet: List[SimulatedDevice] = []
+        for i in range(1, temperature_sensors + 1):
+            device_id = f"simulated_device_{i}"
+            if i == 1:
+                self.fleet.append(SawtoothTemperature(device_id, "Simulierter Temperatursensor"))
+            elif i <= flapping + 1:
+                # pendelt um die Alarmschwelle -> Alarm-Flattern
+                self.fleet.append(TemperatureSensor(device_id, f"Temperatur {i} (flatternd)",
+                                                    self.alarm_threshold, 0.2, 0.3))
+            else:
+                self.fleet.append(TemperatureSensor(device_id, f"Temperatur {i}",
+                                                    random.uniform(18.0, 20.0), 1.0, 0.05))
+        for i in range(1, switches + 1):
+            self.fleet.append(SwitchDevice(f"simulated_switch_{i}", f"Steckdose {i}"))
+        for i in range(1, power_meters + 1):
+            self.fleet.append(PowerMeter(f"simulated_power_{i}", f"Stromzähler {i}"))
+
+        self.devices_by_id: Dict[str, SimulatedDevice] = {device.id: device for device in self.fleet}
+
+    async def poll(self):
+        await self.simulate_values()
 
     async def trigger(self, event_type: EventType, payload: dict):
-        logger.info(f"Simulator plugin triggered with {event_type} and payload: {payload}")
+        logger.debug(f"Simulator plugin triggered with {event_type} and payload: {payload}")
 
-        if event_type == EventType.CYCLE:
-            await self.simulate_value()
-        
-        if event_type == EventType.VALUE_CHANGED:
-            await self.handle_value_changed(payload)
-           
+    def get_devices(self):
+        return [device.to_device() for device in self.fleet]
+
+    def get_alarm_rules(self):
+        return [{
+            "device_id": device.id,
+            "value_type": "temperature",
+            "rule_type": "threshold_above",
+            "threshold": self.alarm_threshold,
+            "alarm_type": "TemperatureThreshold",
+            "message": "Temperatur {device_id}: {previous} -> {value} °C (Grenze {threshold} °C)",
+            "priority": 2  # Medium priority
+        } for device in self.fleet if device.value_type == "temperature"]
+
+    async def handle_command(self, device_id: str, command: str, args: dict) -> dict:
+        device = self.devices_by_id.get(device_id)
+        if device is None:
+            raise ValueError(f"Unknown device {device_id}")
+
+        if command == "refresh":
+            await self._manager.put_event(EventType.VALUE, device.to_value(datetime.now(timezone.utc)))
+            return {}
+
+        if command == "set_value" and device.value_type == "temperature":
+            simulated_value = float(args["value"])
+            await self.log_info(f"Set simulated temperature of {device_id} to {simulated_value:.1f}°C")
+            await self._manager.put_event(EventType.VALUE, {
+                "id": device_id,
+                "value_type": "temperature",
+                "value": f"{simulated_value:.1f}",
+                "unit": "°C",
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            })
+            return {"value": f"{simulated_value:.1f}"}
+
+        if command in ("turn_on", "turn_off") and isinstance(device, SwitchDevice):
+            device.state = "on" if command == "turn_on" else "off"
+            await self._manager.put_event(EventType.VALUE, device.to_value(datetime.now(timezone.utc)))
+            return {"state": device.state}
+
+        raise ValueError(f"Unknown command {command}")
 
     async def log_info(self, message: str):
         log_payload = {
@@ -37,47 +225,20 @@ class Simulator(Plugin):
         }
         await self._manager.put_event(EventType.LOG, log_payload)
 
-    _cnt = 0
-
-    async def simulate_value(self):
-        self._cnt += 1
-        simulated_value = (self._cnt + 18) % 20 * 0.1 + 20  # cycles between 20.0 and 22.0
-        await self.log_info(f"Simulate temperature sensor data {simulated_value:.1f}°C")
-        value_payload = {
-            "id": "simulated_device_1",
-            "value_type": "temperature",
-            "value": f"{simulated_value:.1f}",
-            "unit": "°C",
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
-        await self._manager.put_event(EventType.VALUE, value_payload)
-
-    async def handle_value_changed(self, payload: dict):
-
-        if payload.get("id") != "simulated_device_1":
-            return  # only handle our simulated device
-
-        values = []
-        active = []
-        for value_entry in payload.get("values", []):
-            simulated_value = float(value_entry.get("value"))
-            value_active = simulated_value > 21.0  # Alarm if temperature > 21.0°C
-            values.append(simulated_value)
-            active.append(value_active)
-
-        if len(values) == 1:
-            values.append(None)  # ensure we have two entries for comparison
-            active.append(False)
-
-        if active[0] is not active[1]:  # changed state
-            # raise alarm
-            alarm_payload = {
-                "active": active[0],
-                "acknowledged": False,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "message": f"Alarm: {active[0]} Temperature changed from {values[1]} to {values[0]} °C",
-                "alarm_type": "TemperatureThreshold",
-                "device_id": "simulated_device_1",
-                "priority": 2  # Medium priority
-            }
-            await self._manager.put_event(EventType.ALARM, alarm_payload)
+    async def simulate_values(self):
+        now = datetime.now(timezone.utc)
+        values = [device.to_value(now) for device in self.fleet]
+
+        if self.burst_probability and random.random() < self.burst_probability:
+            burst_devices = random.sample(self.fleet, max(1, int(len(self.fleet) * self.burst_fraction)))
+            for step in range(1, self.burst_size + 1):
+                burst_time = now + timedelta(milliseconds=100 * step)
+                values.extend(device.to_value(burst_time) for device in burst_devices)
+            await self.log_info(f"Burst: {len(burst_devices)} devices send {self.burst_size} extra samples")
+
+        if len(self.fleet) == 1:
+            await self.log_info(f"Simulate temperature sensor data {values[0]['value']}°C")
+            await self._manager.put_event(EventType.VALUE, values[0])
+        else:
+            await self.log_info(f"Simulate {len(values)} values for {len(self.fleet)} devices")
+            await self._manager.put_values(values, self.batch_size)
@@ -1,116 +1,199 @@
-from sqlalchemy.orm import Session
-from models.log import Log
-from models.value import Value
-from core.event_manager import event_manager
-from app.core.database_manager import get_db
-import datetime
+from typing import Dict, List, Optional
 import logging
 
+from core.change_tracker import ChangeTracker
+from core.crud import create_or_update_device, create_or_update_devices, read_current_value_rows, read_device_groups, read_devices
+from core.database_manager import DatabaseManager
+from models.device import Device
+
 logger = logging.getLogger(__name__)
 
 
+UNGROUPED = "_ungrouped"
+
+
 class DeviceService:
-    def __init__(self):
-        pass
-
-    def get_devices(self):
-        return []
-
-    def control_device(self, device_id, command):
-        return {"status": "ok"}
-    
-    async def create_log_entry(self, message: str, protocol: str, level: str, ref_id: str = None, db: Session = None):
-        """Create a new log entry and trigger WebSocket broadcast"""
-        if db is None:
-            # If no DB session provided, create a new one
-            db_gen = get_db()
-            db = next(db_gen)
-            close_db = True
+    """
+    In-memory index over the device registry.
+
+    Devices, groups, group membership and the latest value per device are loaded
+    once at startup and kept up to date by the event handlers, so dashboard views
+    and group aggregates never have to scan the values table.
+    """
+
+    def __init__(self, database_manager: DatabaseManager, change_tracker: Optional[ChangeTracker] = None):
+        self.database_manager = database_manager
+        self.change_tracker = change_tracker or ChangeTracker()
+        self.devices: Dict[str, Dict] = {}
+        self.groups: Dict[str, Dict] = {}
+        self.group_members: Dict[str, Dict[str, None]] = {}  # dict als geordnetes Set
+        self.latest_values: Dict[str, Dict] = {}
+        self.offline: Dict[str, None] = {}  # vom Watchdog gemeldet
+        self.implicit: Dict[str, None] = {}  # nur aus eingehenden Werten bekannt, nicht in der Datenbank
+        self.current_entries: Dict[str, Dict] = {}  # fertige Dashboard-Einträge, nur bei Änderung neu gebaut
+
+    def load(self):
+        """Load devices, groups and current values into the index"""
+        with self.database_manager.session_scope() as db:
+            groups = [group.to_json() for group in read_device_groups(db)]
+            devices = [device.to_json() for device in read_devices(db)]
+            values = read_current_value_rows(db)
+
+        self.devices.clear()
+        self.groups.clear()
+        self.group_members.clear()
+        self.latest_values.clear()
+        self.current_entries.clear()
+        self.implicit.clear()
+        self.change_tracker.touch("values")
+
+        for group in groups:
+            self.groups[group["id"]] = group
+            self.group_members[group["id"]] = {}
+        for device in devices:
+            self._index_device(device)
+        for value in values:
+            self.update_value(value)
+
+        logger.info(f"Device registry loaded: {len(self.devices)} devices, "
+                    f"{len(self.groups)} groups, {len(self.latest_values)} current values")
+
+    def _index_device(self, device: Dict):
+        old_device = self.devices.get(device["id"])
+        if old_device is not None:
+            self.group_members.get(old_device["group_id"] or UNGROUPED, {}).pop(device["id"], None)
+        self.devices[device["id"]] = device
+        self.group_members.setdefault(device["group_id"] or UNGROUPED, {})[device["id"]] = None
+        if device["id"] in self.latest_values:
+            self._update_entry(device["id"])
+
+    @staticmethod
+    def _normalize(device: Dict) -> Dict:
+        return {
+            "id": device["id"],
+            "name": device.get("name") or device["id"],
+            "device_type": device.get("device_type"),
+            "group_id": device.get("group_id"),
+            "plugin": device.get("plugin"),
+            "report_interval": device.get("report_interval")
+        }
+
+    def register_device(self, device: Dict, persist: bool = True):
+        """Add or update a device in the index and optionally in the database"""
+        device = self._normalize(device)
+        if persist:
+            with self.database_manager.session_scope() as db:
+                create_or_update_device(db, Device.from_dict(dict(device)))
+            self.implicit.pop(device["id"], None)
         else:
-            close_db = False
-        
-        try:
-            # Create new log entry
-            log_entry = Log(
-                message=message,
-                protocol=protocol,
-                level=level,
-                ref_id=ref_id,
-                timestamp=datetime.datetime.utcnow()
-            )
-            
-            db.add(log_entry)
-            db.commit()
-            db.refresh(log_entry)
-            
-            # Prepare data for event system
-            log_data = {
-                "id": log_entry.id,
-                "timestamp": log_entry.timestamp.isoformat(),
-                "message": log_entry.message,
-                "protocol": log_entry.protocol,
-                "level": log_entry.level,
-                "ref_id": log_entry.ref_id
-            }
-            
-            # Trigger event with WebSocket broadcast
-            await event_manager.trigger_log_event(log_data)
-            
-            logger.info(f"Created log entry: {message} (ID: {log_entry.id})")
-            return log_entry
-            
-        except Exception as e:
-            logger.error(f"Error creating log entry: {e}")
-            db.rollback()
-            raise
-        finally:
-            if close_db:
-                db.close()
-    
-    async def create_value_entry(self, device_id: str, value_type: str, value: any, unit: str = "", db: Session = None):
-        """Create a new value entry and trigger WebSocket broadcast"""
-        if db is None:
-            # If no DB session provided, create a new one
-            db_gen = get_db()
-            db = next(db_gen)
-            close_db = True
+            self.implicit[device["id"]] = None
+        self._index_device(device)
+
+    def register_plugin_devices(self, devices: List[Dict]):
+        """
+        Register devices announced by plugins. Registry metadata edited in the DB is kept;
+        devices only known from incoming values take name, type and group from the plugin.
+        """
+        changed = []
+        for device in devices:
+            existing = self.devices.get(device["id"])
+            if existing is None or device["id"] in self.implicit:
+                changed.append(self._normalize(device))
+            elif existing["plugin"] != device["plugin"]:
+                changed.append({**existing, "plugin": device["plugin"]})
+
+        if changed:
+            with self.database_manager.session_scope() as db:
+                create_or_update_devices(db, changed)
+            for device in changed:
+                self.implicit.pop(device["id"], None)
+                self._index_device(device)
+            logger.info(f"Registered {len(changed)} plugin devices")
+
+    # Devices and groups
+    def get_devices(self) -> List[Dict]:
+        return list(self.devices.values())
+
+    def get_device(self, device_id: str) -> Optional[Dict]:
+        return self.devices.get(device_id)
+
+    def get_groups(self) -> List[Dict]:
+        return list(self.groups.values())
+
+    def get_group(self, group_id: str) -> Optional[Dict]:
+        return self.groups.get(group_id)
+
+    def get_group_devices(self, group_id: str) -> List[Dict]:
+        return [self.devices[device_id] for device_id in self.group_members.get(group_id, {})]
+
+    # Values
+    def get_latest_value(self, device_id: str) -> Optional[Dict]:
+        return self.latest_values.get(device_id)
+
+    def update_value(self, value: Dict):
+        """Store the latest value of a device; unknown devices are registered implicitly"""
+        device_id = value["id"]
+        if device_id not in self.devices:
+            # Gerät ist (noch) nicht registriert -> nur im Speicher aufnehmen
+            self.register_device({"id": device_id, "device_type": value.get("value_type")}, persist=False)
+        self.latest_values[device_id] = value
+        self._update_entry(device_id)
+
+    def set_online(self, device_id: str, online: bool):
+        if online:
+            self.offline.pop(device_id, None)
         else:
-            close_db = False
-        
-        try:
-            # Create new value entry
-            value_entry = Value(
-                id=device_id,
-                timestamp=datetime.datetime.utcnow(),
-                value={
-                    "type": value_type,
-                    "value": value,
-                    "unit": unit
-                }
-            )
-            
-            db.add(value_entry)
-            db.commit()
-            db.refresh(value_entry)
-            
-            # Get updated dashboard data for broadcast
-            from api.dashboard import _get_current_values
-            values_data = await _get_current_values(db)
-            
-            # Trigger event with WebSocket broadcast
-            await event_manager.trigger_value_event(values_data)
-            
-            logger.info(f"Created value entry for {device_id}: {value_type}={value}{unit}")
-            return value_entry
-            
-        except Exception as e:
-            logger.error(f"Error creating value entry: {e}")
-            db.rollback()
-            raise
-        finally:
-            if close_db:
-                db.close()
-
-
-# Global instance
-device_service = DeviceService()
+            self.offline[device_id] = None
+        if device_id in self.latest_values:
+            self._update_entry(device_id)
+
+    def _update_entry(self, device_id: str):
+        device = self.devices[device_id]
+        self.current_entries[device_id] = {
+            **self.latest_values[device_id],
+            "name": device["name"],
+            "group_id": device["group_id"],
+            "offline": device_id in self.offline
+        }
+        self.change_tracker.touch("values")
+
+    def get_current_values(self) -> List[Dict]:
+        """Current value of every device enriched with device name and group (entries are shared, do not modify)"""
+        return list(self.current_entries.values())
+
+    def get_group_overview(self) -> List[Dict]:
+        """Groups with their devices, current values and numeric aggregates per value type"""
+        overview = []
+        group_ids = list(self.groups.keys())
+        if self.group_members.get(UNGROUPED):
+            group_ids.append(UNGROUPED)
+
+        for group_id in group_ids:
+            group = self.groups.get(group_id, {"id": UNGROUPED, "name": "Ohne Gruppe", "sort_order": None})
+            devices = []
+            aggregates: Dict[str, Dict] = {}
+            for device_id in self.group_members.get(group_id, {}):
+                value = self.latest_values.get(device_id)
+                devices.append({**self.devices[device_id], "value": value})
+                if value is None:
+                    continue
+                try:
+                    number = float(value["value"])
+                except (TypeError, ValueError):
+                    continue
+                aggregate = aggregates.get(value["value_type"])
+                if aggregate is None:
+                    aggregates[value["value_type"]] = {
+                        "count": 1, "min": number, "max": number, "sum": number, "unit": value.get("unit")
+                    }
+                else:
+                    aggregate["count"] += 1
+                    aggregate["min"] = min(aggregate["min"], number)
+                    aggregate["max"] = max(aggregate["max"], number)
+                    aggregate["sum"] += number
+
+            for aggregate in aggregates.values():
+                aggregate["avg"] = aggregate.pop("sum") / aggregate["count"]
+
+            overview.append({**group, "devices": devices, "aggregates": aggregates})
+        return overview
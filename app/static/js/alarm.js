@@ -56,6 +56,11 @@ class AlarmWebSocket {
     }
     
     handleMessage(message) {
+        // Heartbeat des Servers beantworten, sonst wird die Verbindung nach dem Idle-Timeout geschlossen
+        if (message.type === 'ping') {
+            this.socket.send(JSON.stringify({ type: 'pong', ts: message.ts }));
+            return;
+        }
         console.log('Received alarm message:', message);
         
         switch (message.type) {
@@ -36,6 +36,12 @@ $(document).ready(function() {
         ws.onmessage = function(event) {
             const message = JSON.parse(event.data);
             
+            // Heartbeat des Servers beantworten, sonst wird die Verbindung nach dem Idle-Timeout geschlossen
+            if (message.type === 'ping') {
+                ws.send(JSON.stringify({ type: 'pong', ts: message.ts }));
+                return;
+            }
+            
             if (message.type === 'initial_data' || message.type === 'values_update') {
                 updateDeviceDisplay(message.data);
                 